@@ -0,0 +1,230 @@
+"""
+Admission control for the Trustify API.
+
+Requests are sorted into priority classes (health > text > image > batch).
+Health checks bypass admission; every other class shares a pool of worker
+slots. Image and batch have per-class caps and together may never take the
+slots reserved for text, so their spikes always leave headroom for text
+moderation. Waiting requests sit in bounded per-class queues and are
+shed once their queueing deadline passes, and each client is held to a token
+bucket where heavier classes cost more tokens.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# name -> (priority, max slots, max queued, max queue wait seconds, token cost)
+PRIORITY_CLASSES = {
+    "health": (0, None, None, None, 0),
+    "text": (1, None, 64, 2.0, 1),
+    "image": (2, 0.75, 32, 10.0, 5),
+    "batch": (3, 0.25, 8, 30.0, 10),
+}
+
+# (method or None for any, path prefix, class); first match wins
+ROUTE_CLASSES = (
+    (None, "/health", "health"),
+    (None, "/admin", "health"),
+    (None, "/diagnostics", "health"),
+    (None, "/ocr/stats", "health"),
+    ("DELETE", "/analyze/screenshot/session/", "text"),
+    (None, "/analyze/text", "text"),
+    (None, "/analyze/screenshot", "image"),
+    (None, "/ocr", "image"),
+    (None, "/test", "batch"),
+)
+
+
+def classify(path: str, method: str = "GET") -> str:
+    if path == "/":
+        return "health"
+    for route_method, prefix, cls in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and path.startswith(prefix):
+            return cls
+    return "text"
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets, keeping at most ``max_clients`` idle buckets around."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str, cost: float) -> Tuple[bool, float]:
+        """Spend ``cost`` tokens; returns (allowed, seconds until enough tokens)."""
+        if cost <= 0 or self.rate <= 0:
+            return True, 0.0
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Priority-aware slot pool. Must be used from the event loop thread only.
+    """
+
+    def __init__(self, max_concurrent: int = 8, rate: float = 10.0, burst: float = 40.0,
+                 client_header: Optional[str] = None, reserved_text: Optional[int] = None):
+        self.max_concurrent = max_concurrent
+        if reserved_text is None:
+            reserved_text = max(1, max_concurrent // 4)
+        # Slots image and batch together can never occupy
+        self.reserved_text = max(0, min(reserved_text, max_concurrent - 1))
+        self.limiter = TokenBucketLimiter(rate, burst)
+        self.client_header = client_header.lower().encode() if client_header else None
+        self.in_use = 0
+        self.in_use_by_class: Dict[str, int] = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._waiters: Dict[str, deque] = {cls: deque() for cls in PRIORITY_CLASSES}
+        self.counters: Dict[str, Dict[str, int]] = {
+            cls: {"admitted": 0, "rate_limited": 0, "shed_queue_full": 0, "shed_deadline": 0}
+            for cls in PRIORITY_CLASSES
+        }
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        reserved = os.getenv("ADMISSION_RESERVED_TEXT")
+        return cls(
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "8")),
+            rate=float(os.getenv("ADMISSION_RATE", "10")),
+            burst=float(os.getenv("ADMISSION_BURST", "40")),
+            client_header=os.getenv("ADMISSION_CLIENT_HEADER") or None,
+            reserved_text=int(reserved) if reserved else None,
+        )
+
+    def _class_limit(self, cls: str) -> int:
+        share = PRIORITY_CLASSES[cls][1]
+        return self.max_concurrent if share is None else max(1, int(self.max_concurrent * share))
+
+    def _can_run(self, cls: str) -> bool:
+        if self.in_use >= self.max_concurrent or self.in_use_by_class[cls] >= self._class_limit(cls):
+            return False
+        if cls == "text":
+            return True
+        non_text = self.in_use - self.in_use_by_class["text"]
+        return non_text < self.max_concurrent - self.reserved_text
+
+    def _grant(self, cls: str) -> None:
+        self.in_use += 1
+        self.in_use_by_class[cls] += 1
+
+    async def acquire(self, cls: str) -> Optional[str]:
+        """Take a slot for ``cls``; returns None when admitted, else the shed reason."""
+        _, _, max_queued, deadline, _ = PRIORITY_CLASSES[cls]
+        queue = self._waiters[cls]
+        if not queue and self._can_run(cls):
+            self._grant(cls)
+            return None
+        if len(queue) >= max_queued:
+            return "shed_queue_full"
+        fut = asyncio.get_running_loop().create_future()
+        queue.append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout=deadline)
+            return None
+        except asyncio.TimeoutError:
+            return "shed_deadline"
+        except asyncio.CancelledError:
+            # Client went away after a slot was already handed over
+            if fut.done() and not fut.cancelled():
+                self.release(cls)
+            raise
+        finally:
+            if fut in queue:
+                queue.remove(fut)
+
+    def release(self, cls: str) -> None:
+        self.in_use -= 1
+        self.in_use_by_class[cls] -= 1
+        # Hand freed slots to the highest-priority waiter that fits
+        for name in sorted(PRIORITY_CLASSES, key=lambda c: PRIORITY_CLASSES[c][0]):
+            queue = self._waiters[name]
+            while queue and self._can_run(name):
+                fut = queue.popleft()
+                if not fut.done():
+                    self._grant(name)
+                    fut.set_result(True)
+
+    def client_key(self, scope) -> str:
+        if self.client_header:
+            for key, value in scope.get("headers", []):
+                if key == self.client_header:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "reserved_text": self.reserved_text,
+            "in_use": self.in_use,
+            "classes": {
+                cls: {
+                    "in_use": self.in_use_by_class[cls],
+                    "queued": len(self._waiters[cls]),
+                    **self.counters[cls],
+                }
+                for cls in PRIORITY_CLASSES
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to every HTTP request."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        ctl = self.controller
+        cls = classify(scope["path"], scope.get("method", "GET"))
+        if cls == "health":
+            return await self.app(scope, receive, send)
+
+        allowed, retry_after = ctl.limiter.take(ctl.client_key(scope), PRIORITY_CLASSES[cls][4])
+        if not allowed:
+            ctl.counters[cls]["rate_limited"] += 1
+            return await self._reject(scope, receive, send, 429, "Rate limit exceeded", retry_after)
+
+        shed = await ctl.acquire(cls)
+        if shed:
+            ctl.counters[cls][shed] += 1
+            logger.warning(f"⚠️ Shedding {cls} request {scope['path']}: {shed}")
+            return await self._reject(scope, receive, send, 503, "Server busy, retry later",
+                                      PRIORITY_CLASSES[cls][3])
+
+        ctl.counters[cls]["admitted"] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ctl.release(cls)
+
+    @staticmethod
+    async def _reject(scope, receive, send, status: int, message: str, retry_after: float):
+        response = JSONResponse(
+            {"ok": False, "error": message},
+            status_code=status,
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+        await response(scope, receive, send)
@@ -1,7 +1,8 @@
 import logging
 import json
+import os
 from typing import Dict, Any, Optional
-from .providers.azure_client import AzureContentSafetyProvider
+from .providers.factory import create_provider
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,8 +18,9 @@ class ContentDetector:
             raise NotImplementedError("Only 'azure' provider is supported")
         
         try:
-            self.provider = AzureContentSafetyProvider()
-            logger.info("✅ Azure Content Safety provider initialized successfully")
+            self.provider = create_provider(provider)
+            mode = os.getenv("CONTENT_SAFETY_MODE", "live")
+            logger.info(f"✅ Content Safety provider initialized ({type(self.provider).__name__}, mode: {mode})")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Azure provider: {e}")
             raise
@@ -59,30 +61,7 @@ class ContentDetector:
             if debug:
                 logger.info(f"🔍 Azure raw result: {json.dumps(azure_result, indent=2)}")
             
-            # Process the results
-            categories = azure_result.get("categories", {})
-            confidence_scores = azure_result.get("confidence_scores", {})
-            risk_level = azure_result.get("risk_level", "Safe")
-            error = azure_result.get("error")
-            
-            # Determine if content is harmful
-            is_harmful = self._determine_harmful_status(categories, risk_level, confidence_scores, debug)
-            
-            result = {
-                "is_harmful": is_harmful,
-                "risk_level": risk_level,
-                "categories": categories,
-                "confidence_scores": confidence_scores,
-                "provider": "azure",
-                "error": error,
-                "text_length": len(text.strip()),
-                "analysis_summary": self._create_summary(categories, confidence_scores, is_harmful)
-            }
-            
-            if debug:
-                logger.info(f"📊 Final result: {json.dumps(result, indent=2)}")
-            
-            return result
+            return self.from_response(text, azure_result, debug)
             
         except Exception as e:
             logger.error(f"❌ Content analysis failed: {str(e)}", exc_info=True)
@@ -96,6 +75,35 @@ class ContentDetector:
                 "text_length": len(text) if text else 0
             }
 
+    def from_response(self, text: str, azure_result: Dict[str, Any], debug: bool = False) -> Dict[str, Any]:
+        """
+        Build the analysis result from an already fetched provider response
+        """
+        # Process the results
+        categories = azure_result.get("categories", {})
+        confidence_scores = azure_result.get("confidence_scores", {})
+        risk_level = azure_result.get("risk_level", "Safe")
+        error = azure_result.get("error")
+        
+        # Determine if content is harmful
+        is_harmful = self._determine_harmful_status(categories, risk_level, confidence_scores, debug)
+        
+        result = {
+            "is_harmful": is_harmful,
+            "risk_level": risk_level,
+            "categories": categories,
+            "confidence_scores": confidence_scores,
+            "provider": "azure",
+            "error": error,
+            "text_length": len(text.strip()),
+            "analysis_summary": self._create_summary(categories, confidence_scores, is_harmful)
+        }
+        
+        if debug:
+            logger.info(f"📊 Final result: {json.dumps(result, indent=2)}")
+        
+        return result
+
     def _determine_harmful_status(self, categories: Dict[str, str], risk_level: str, 
                                  confidence_scores: Dict[str, float], debug: bool = False) -> bool:
         """
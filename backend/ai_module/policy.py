@@ -0,0 +1,168 @@
+"""
+Vectorized harm policies over stored raw Azure severities.
+
+Every provider response can be appended to a SeverityLog: a flat binary file
+of fixed-size records (per-category severity and confidence). A Policy turns
+a whole log into an is-harmful mask with a few numpy comparisons, so a new
+threshold can be tried against millions of past results without calling Azure:
+
+    python -m ai_module.policy severities.bin --policy stricter.json
+    python -m ai_module.policy --from-cassette content_safety_cassette.sqlite --policy stricter.json
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("Hate", "SelfHarm", "Sexual", "Violence")
+
+RECORD = np.dtype([
+    ("ts", "<f8"),
+    ("severity", "u1", (len(CATEGORIES),)),
+    ("confidence", "<f4", (len(CATEGORIES),)),
+])
+
+# Severity implied by a level when only levels were kept (older cassettes)
+LEVEL_SEVERITY = {"Safe": 0, "Low": 1, "Medium": 2, "High": 4}
+
+
+def to_record(result: dict, ts: Optional[float] = None) -> np.ndarray:
+    """Pack one provider response into a RECORD row."""
+    rec = np.zeros(1, dtype=RECORD)
+    rec["ts"] = time.time() if ts is None else ts
+    severities = result.get("severities") or {}
+    levels = result.get("categories") or {}
+    confidences = result.get("confidence_scores") or {}
+    for i, cat in enumerate(CATEGORIES):
+        sev = severities.get(cat)
+        if sev is None:
+            sev = LEVEL_SEVERITY.get(levels.get(cat, "Safe"), 0)
+        rec["severity"][0, i] = min(int(sev), 255)
+        rec["confidence"][0, i] = float(confidences.get(cat) or 0.0)
+    return rec
+
+
+def from_results(results: Iterable[dict]) -> np.ndarray:
+    """Pack successful provider responses into a RECORD array."""
+    rows = [to_record(r) for r in results if not r.get("error")]
+    return np.concatenate(rows) if rows else np.zeros(0, dtype=RECORD)
+
+
+class SeverityLog:
+    """Append-only file of RECORD rows; ``load`` memory-maps it for bulk scoring."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, result: dict) -> None:
+        if result.get("error"):
+            return
+        data = to_record(result).tobytes()
+        with self._lock, open(self.path, "ab") as f:
+            f.write(data)
+
+    def load(self) -> np.ndarray:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < RECORD.itemsize:
+            return np.zeros(0, dtype=RECORD)
+        # Ignore a torn trailing record from an interrupted append
+        count = os.path.getsize(self.path) // RECORD.itemsize
+        return np.memmap(self.path, dtype=RECORD, mode="r", shape=(count,))
+
+
+class Policy:
+    """
+    A record is harmful when any category reaches its minimum severity, or
+    when ``confidence_threshold`` is set and any confidence exceeds it.
+
+    min_severity: one int for every category, or {"Hate": 2, ...}; categories
+    left out of a dict are never flagged on severity.
+    """
+
+    def __init__(self, name: str, min_severity: Union[int, Dict[str, int]] = 1,
+                 confidence_threshold: Optional[float] = None):
+        self.name = name
+        if isinstance(min_severity, dict):
+            thresholds = [min_severity.get(cat, 256) for cat in CATEGORIES]
+        else:
+            thresholds = [min_severity] * len(CATEGORIES)
+        self.min_severity = np.asarray(thresholds, dtype=np.int16)
+        self.confidence_threshold = confidence_threshold
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Policy":
+        return cls(data.get("name", "custom"), data.get("min_severity", 1), data.get("confidence_threshold"))
+
+    def category_hits(self, records: np.ndarray) -> np.ndarray:
+        """(n, categories) boolean matrix of categories that trip this policy."""
+        hits = records["severity"].astype(np.int16) >= self.min_severity
+        if self.confidence_threshold is not None:
+            hits |= records["confidence"] > self.confidence_threshold
+        return hits
+
+    def evaluate(self, records: np.ndarray) -> np.ndarray:
+        return self.category_hits(records).any(axis=1)
+
+
+# The decisions currently hardcoded in TextAnalyzer.analyze and
+# ContentDetector._determine_harmful_status, expressed as policies
+TEXT_ANALYZER_POLICY = Policy("text_analyzer", min_severity=1)
+CONTENT_DETECTOR_POLICY = Policy("content_detector", min_severity=1, confidence_threshold=0.7)
+BUILTIN_POLICIES = {p.name: p for p in (TEXT_ANALYZER_POLICY, CONTENT_DETECTOR_POLICY)}
+
+
+def compare(records: np.ndarray, current: Policy, proposed: Policy) -> dict:
+    """How many stored results each policy flags, and how many would change verdict."""
+    started = time.perf_counter()
+    old_hits, new_hits = current.category_hits(records), proposed.category_hits(records)
+    old, new = old_hits.any(axis=1), new_hits.any(axis=1)
+    return {
+        "records": int(len(records)),
+        "current": current.name,
+        "proposed": proposed.name,
+        "flagged_current": int(old.sum()),
+        "flagged_proposed": int(new.sum()),
+        "newly_flagged": int((new & ~old).sum()),
+        "newly_cleared": int((old & ~new).sum()),
+        "by_category": {
+            cat: {"current": int(old_hits[:, i].sum()), "proposed": int(new_hits[:, i].sum())}
+            for i, cat in enumerate(CATEGORIES)
+        },
+        "elapsed_ms": round(1000 * (time.perf_counter() - started), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-score stored severities against a new policy")
+    parser.add_argument("log", nargs="?", help="SeverityLog file (SEVERITY_LOG)")
+    parser.add_argument("--from-cassette", metavar="PATH",
+                        help="score the responses recorded in a provider cassette instead of a log")
+    parser.add_argument("--policy", required=True,
+                        help="JSON file with name / min_severity / confidence_threshold, or a built-in name")
+    parser.add_argument("--against", default="content_detector", choices=sorted(BUILTIN_POLICIES))
+    args = parser.parse_args()
+    if not args.log and not args.from_cassette:
+        parser.error("a SeverityLog file or --from-cassette is required")
+
+    if args.policy in BUILTIN_POLICIES:
+        proposed = BUILTIN_POLICIES[args.policy]
+    else:
+        with open(args.policy) as f:
+            proposed = Policy.from_dict(json.load(f))
+    if args.from_cassette:
+        from .providers.cassette import Cassette
+        records = from_results(Cassette(args.from_cassette).responses())
+    else:
+        records = SeverityLog(args.log).load()
+    print(json.dumps(compare(records, BUILTIN_POLICIES[args.against], proposed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
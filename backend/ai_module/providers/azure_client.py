@@ -22,6 +22,7 @@ class AzureContentSafetyProvider:
           {
             "categories": {"Hate":"Low","SelfHarm":"Safe",...},
             "confidence_scores": {"Hate":0.12,...},
+            "severities": {"Hate":2,"SelfHarm":0,...},
             "risk_level": "Low" | "Medium" | "High" | "Safe"
           }
         """
@@ -34,16 +35,19 @@ class AzureContentSafetyProvider:
             # The SDK returns a collection of category results with severity & confidence
             cats = {}
             conf = {}
+            sevs = {}
             max_sev = 0
             for r in resp.categories_analysis:
                 level = self._severity_to_level(r.severity)
                 cats[r.category] = level
                 # confidence may be None depending on API version; guard with 0.0
                 conf[r.category] = float(getattr(r, "confidence", 0.0) or 0.0)
-                max_sev = max(max_sev, int(r.severity or 0))
+                sevs[r.category] = int(r.severity or 0)
+                max_sev = max(max_sev, sevs[r.category])
             return {
                 "categories": cats,
                 "confidence_scores": conf,
+                "severities": sevs,
                 "risk_level": self._severity_to_level(max_sev),
             }
         except Exception as e:
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def cassette_key(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded provider responses in a single SQLite file, indexed by the
+    SHA-256 of the analyzed text. Responses are stored as compact JSON with
+    the latency observed when they were recorded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, latency_ms REAL NOT NULL, response TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latency_ms, response FROM responses WHERE key = ?", (cassette_key(text),)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, text: str, latency_ms: float, response: dict) -> None:
+        payload = json.dumps(response, separators=(",", ":"), sort_keys=True)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, latency_ms, response) VALUES (?, ?, ?)",
+                (cassette_key(text), latency_ms, payload),
+            )
+            self._conn.commit()
+
+    def responses(self) -> Iterator[dict]:
+        """Every recorded response, in no particular order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT response FROM responses").fetchall()
+        for (payload,) in rows:
+            yield json.loads(payload)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class RecordingProvider:
+    """Passes calls to a live provider and records every successful response."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def analyze_text(self, text: str) -> dict:
+        started = time.perf_counter()
+        result = self.inner.analyze_text(text)
+        latency_ms = 1000 * (time.perf_counter() - started)
+        if not result.get("error"):
+            self.cassette.put(text, latency_ms, result)
+        return result
+
+
+class ReplayProvider:
+    """
+    Serves recorded responses without any network access.
+
+    latency: "recorded" sleeps for the latency seen at record time (times
+    ``latency_scale``), "none" answers immediately and a number sleeps that
+    many milliseconds for every call. Texts missing from the cassette return
+    the same shape as a failed Azure call.
+    """
+
+    def __init__(self, cassette: Cassette, latency: Union[str, float] = "recorded", latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.hits = 0
+        self.misses = 0
+
+    def analyze_text(self, text: str) -> dict:
+        entry = self.cassette.get(text)
+        if entry is None:
+            self.misses += 1
+            return {"categories": {}, "confidence_scores": {}, "risk_level": "Safe",
+                    "error": "No recorded response for this text"}
+        self.hits += 1
+        recorded_ms, result = entry
+        if self.latency == "recorded":
+            delay_ms = recorded_ms * self.latency_scale
+        elif self.latency == "none":
+            delay_ms = 0.0
+        else:
+            delay_ms = float(self.latency)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        return result
@@ -0,0 +1,77 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+_cassettes = {}
+_severity_logs = {}
+
+
+class SeverityLoggingProvider:
+    """Appends every provider response to a SeverityLog for later policy re-scoring."""
+
+    def __init__(self, inner, log):
+        self.inner = inner
+        self.log = log
+
+    def analyze_text(self, text: str) -> dict:
+        result = self.inner.analyze_text(text)
+        try:
+            self.log.append(result)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not append to severity log: {e}")
+        return result
+
+
+def _cassette(path: str):
+    from .cassette import Cassette
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+
+def create_provider(provider: str = 'azure'):
+    """
+    Build the content safety provider for the configured mode.
+
+    CONTENT_SAFETY_MODE:
+      live   - call Azure Content Safety (default)
+      record - call Azure and save every response to CONTENT_SAFETY_CASSETTE
+      replay - answer from CONTENT_SAFETY_CASSETTE only, no network access;
+               CONTENT_SAFETY_REPLAY_LATENCY is 'recorded', 'none' or milliseconds
+
+    SEVERITY_LOG, when set, also appends every response's raw severities there
+    (see ai_module.policy).
+    """
+    inner = _create_provider(provider)
+    path = os.getenv("SEVERITY_LOG")
+    if not path:
+        return inner
+    from ..policy import SeverityLog
+    if path not in _severity_logs:
+        _severity_logs[path] = SeverityLog(path)
+    return SeverityLoggingProvider(inner, _severity_logs[path])
+
+
+def _create_provider(provider: str):
+    if provider != 'azure':
+        raise NotImplementedError("Only 'azure' provider is wired right now.")
+
+    mode = os.getenv("CONTENT_SAFETY_MODE", "live")
+    path = os.getenv("CONTENT_SAFETY_CASSETTE", "content_safety_cassette.sqlite")
+
+    if mode == "replay":
+        from .cassette import ReplayProvider
+        latency = os.getenv("CONTENT_SAFETY_REPLAY_LATENCY", "recorded")
+        logger.info(f"📼 Replaying content safety responses from {path} (latency: {latency})")
+        return ReplayProvider(_cassette(path), latency=latency)
+
+    from .azure_client import AzureContentSafetyProvider
+    live = AzureContentSafetyProvider()
+    if mode == "record":
+        from .cassette import RecordingProvider
+        logger.info(f"📼 Recording content safety responses to {path}")
+        return RecordingProvider(live, _cassette(path))
+    if mode != "live":
+        raise ValueError(f"Unknown CONTENT_SAFETY_MODE '{mode}'")
+    return live
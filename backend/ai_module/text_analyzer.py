@@ -1,13 +1,11 @@
 import logging
-from .providers.azure_client import AzureContentSafetyProvider
+from .providers.factory import create_provider
 
 logger = logging.getLogger(__name__)
 
 class TextAnalyzer:
     def __init__(self, provider: str = 'azure'):
-        if provider != 'azure':
-            raise NotImplementedError("Only 'azure' provider is wired right now.")
-        self.provider = AzureContentSafetyProvider()
+        self.provider = create_provider(provider)
 
     def analyze(self, text: str) -> dict:
         if not text or not text.strip():
@@ -15,7 +13,9 @@ class TextAnalyzer:
                 "is_harmful": False, "risk_level": "Safe", "categories": {},
                 "confidence_scores": {}, "provider":"azure", "error": "Empty text"
             }
-        out = self.provider.analyze_text(text)
+        return self.from_response(self.provider.analyze_text(text))
+
+    def from_response(self, out: dict) -> dict:
         risk = out.get("risk_level","Safe")
         is_harmful = risk in ("Low","Medium","High") and any(
             lvl in ("Low","Medium","High") and lvl != "Safe" for lvl in out.get("categories",{}).values()
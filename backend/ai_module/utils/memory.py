@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class RSSSampler:
+    """
+    Polls RSS every ``interval`` seconds while any stage is open and raises
+    each open stage's high-water mark. Unlike tracemalloc this sees native
+    allocations too (torch tensors, image buffers). RSS is process wide, so
+    stages that overlap share their peaks.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self._marks: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self) -> List[int]:
+        """Start tracking; returns a one-item list holding the peak RSS so far."""
+        mark = [current_rss()]
+        with self._lock:
+            self._marks[id(mark)] = mark
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trustify-rss-sampler", daemon=True)
+                self._thread.start()
+        return mark
+
+    def unwatch(self, mark: List[int]) -> int:
+        with self._lock:
+            self._marks.pop(id(mark), None)
+        mark[0] = max(mark[0], current_rss())
+        return mark[0]
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._marks:
+                    self._thread = None
+                    return
+                marks = list(self._marks.values())
+            rss = current_rss()
+            for mark in marks:
+                if rss > mark[0]:
+                    mark[0] = rss
+            time.sleep(self.interval)
+
+
+class RequestMemory:
+    """Per-stage RSS deltas and sampled RSS peaks (plus Python allocation deltas, when tracing) for one request."""
+
+    def __init__(self, route: str, tracing: bool, sampler: RSSSampler):
+        self.route = route
+        self.tracing = tracing
+        self.sampler = sampler
+        self.started = time.time()
+        self.rss_start = current_rss()
+        self.rss_end = self.rss_start
+        self.stages: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        mark = self.sampler.watch()
+        rss_before = mark[0]
+        if self.tracing:
+            traced_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            peak = self.sampler.unwatch(mark)
+            entry = {
+                "stage": name,
+                "ms": round(1000 * (time.perf_counter() - started), 1),
+                "rss_delta_kb": (current_rss() - rss_before) // 1024,
+                "rss_peak_kb": (peak - rss_before) // 1024,
+            }
+            if self.tracing:
+                entry["py_delta_kb"] = (tracemalloc.get_traced_memory()[0] - traced_before) // 1024
+            self.stages.append(entry)
+
+    def as_dict(self) -> dict:
+        return {
+            "route": self.route,
+            "at": self.started,
+            "rss_delta_kb": (self.rss_end - self.rss_start) // 1024,
+            "stages": self.stages,
+        }
+
+
+class MemoryAccountant:
+    """
+    Aggregates per-route, per-stage memory figures and keeps the most recent
+    requests. RSS deltas and peaks (sampled every MEMORY_SAMPLE_MS) are always
+    recorded; Python allocation deltas and top allocation sites need
+    MEMORY_TRACEMALLOC=1 (tracemalloc slows allocation-heavy code).
+    """
+
+    def __init__(self, tracing: Optional[bool] = None, recent: int = 100,
+                 sample_interval: Optional[float] = None):
+        if tracing is None:
+            tracing = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+        if sample_interval is None:
+            sample_interval = float(os.getenv("MEMORY_SAMPLE_MS", "10")) / 1000
+        self.tracing = tracing
+        if tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.sampler = RSSSampler(sample_interval)
+        self.rss_at_start = current_rss()
+        self._recent = deque(maxlen=recent)
+        self._totals: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, route: str) -> RequestMemory:
+        return RequestMemory(route, self.tracing, self.sampler)
+
+    def finish(self, req: RequestMemory) -> None:
+        req.rss_end = current_rss()
+        with self._lock:
+            self._recent.append(req.as_dict())
+            route = self._totals.setdefault(req.route, {})
+            for entry in req.stages + [{"stage": "total", "rss_delta_kb": (req.rss_end - req.rss_start) // 1024}]:
+                agg = route.setdefault(entry["stage"], {"count": 0, "rss_delta_kb_sum": 0,
+                                                        "rss_delta_kb_max": 0, "rss_peak_kb_max": 0})
+                agg["count"] += 1
+                agg["rss_delta_kb_sum"] += entry["rss_delta_kb"]
+                agg["rss_delta_kb_max"] = max(agg["rss_delta_kb_max"], entry["rss_delta_kb"])
+                agg["rss_peak_kb_max"] = max(agg["rss_peak_kb_max"], entry.get("rss_peak_kb", 0))
+
+    @contextmanager
+    def request(self, route: str):
+        req = self.start(route)
+        try:
+            yield req
+        finally:
+            self.finish(req)
+
+    def report(self, recent: int = 20, top_allocations: int = 0) -> dict:
+        with self._lock:
+            routes = {
+                route: {
+                    stage: {
+                        "count": agg["count"],
+                        "rss_delta_kb_avg": round(agg["rss_delta_kb_sum"] / agg["count"], 1),
+                        "rss_delta_kb_max": agg["rss_delta_kb_max"],
+                        "rss_peak_kb_max": agg["rss_peak_kb_max"],
+                    }
+                    for stage, agg in stages.items()
+                }
+                for route, stages in self._totals.items()
+            }
+            last = list(self._recent)[-recent:] if recent > 0 else []
+        report = {
+            "rss_mb": round(current_rss() / 1048576, 1),
+            "rss_growth_mb": round((current_rss() - self.rss_at_start) / 1048576, 1),
+            "tracemalloc": self.tracing,
+            "routes": routes,
+            "recent": last,
+        }
+        if self.tracing and top_allocations > 0:
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:top_allocations]
+            report["top_allocations"] = [
+                {"site": str(stat.traceback[0]), "size_kb": stat.size // 1024, "count": stat.count}
+                for stat in stats
+            ]
+        return report
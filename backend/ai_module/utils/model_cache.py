@@ -0,0 +1,141 @@
+import importlib
+import logging
+import os
+import time
+from typing import Dict, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Recognizer module -> EasyOCR's constructor params for its built-in networks
+# (easyocr.Reader keeps these as locals, so they are mirrored here)
+RECOGNIZER_NETWORKS = {
+    "easyocr.model.model": {"input_channel": 1, "output_channel": 512, "hidden_size": 512},
+    "easyocr.model.vgg_model": {"input_channel": 1, "output_channel": 256, "hidden_size": 256},
+}
+
+
+def _cache_dir() -> str:
+    return os.path.expanduser(os.getenv("OCR_MODEL_CACHE_DIR", "~/.cache/trustify/ocr"))
+
+
+def _load(torch, path: str):
+    # Plain tensors only (no pickled code); mmap leaves them in the page cache
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+
+def _save(torch, obj, path: str) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.chmod(directory, 0o700)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def _quantize(torch, module):
+    """The same dynamic int8 quantization easyocr.Reader applies on CPU."""
+    torch.quantization.quantize_dynamic(module, dtype=torch.qint8, inplace=True)
+    return module.eval()
+
+
+def import_ocr_stack() -> Dict[str, float]:
+    """Import torch and easyocr, returning per-import seconds (near zero once loaded)."""
+    phases: Dict[str, float] = {}
+    started = time.perf_counter()
+    import torch  # noqa: F401
+    phases["import_torch"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    import easyocr  # noqa: F401
+    phases["import_easyocr"] = time.perf_counter() - started
+    return phases
+
+
+def load_reader(languages: Sequence[str], gpu: bool = False, detector: bool = True,
+                cache_dir: str = None) -> Tuple[object, str, Dict[str, float]]:
+    """
+    Build an EasyOCR reader, warm-starting from cached state dicts when possible.
+
+    The first (cold) build on a host saves the detector's and recognizer's
+    float state dicts; later builds construct an empty Reader, build fresh
+    networks and load the memory-mapped weights into them with
+    ``assign=True``, skipping the model checksum and copy of the original
+    weight files. The CRAFT detector has no quantizable layers, so its
+    weights stay as shared page-cache pages; the recognizer's LSTM and linear
+    layers are re-packed by quantization on every load.
+
+    Returns (reader, "warm" | "cold", per-phase seconds).
+    """
+    phases = import_ocr_stack()
+    import torch
+    import easyocr
+    from easyocr.config import BASE_PATH
+    from easyocr.craft import CRAFT
+    from easyocr.detection import get_detector, get_textbox
+    from easyocr.utils import CTCLabelConverter
+    phases["import_easyocr"] = time.perf_counter() - started
+
+    cache_dir = cache_dir or _cache_dir()
+    tag = f"easyocr{easyocr.__version__}-torch{torch.__version__}".replace("+", "_")
+    det_path = os.path.join(cache_dir, f"detector-craft-{tag}.state.pt")
+    rec_path = os.path.join(cache_dir, f"recognizer-{'+'.join(languages)}-{tag}.state.pt")
+
+    if not gpu and os.path.isfile(rec_path) and (not detector or os.path.isfile(det_path)):
+        try:
+            started = time.perf_counter()
+            reader = easyocr.Reader(list(languages), gpu=False, detector=False, recognizer=False, verbose=False)
+            phases["construct"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            if detector:
+                net = CRAFT()
+                net.load_state_dict(_load(torch, det_path), assign=True)
+                reader.detector = _quantize(torch, net)
+                reader.detect_network = "craft"
+                reader.get_detector, reader.get_textbox = get_detector, get_textbox
+            cached = _load(torch, rec_path)
+            # Only EasyOCR's own recognizer modules are ever imported from the cache's metadata
+            network = RECOGNIZER_NETWORKS[cached["module"]]
+            dict_list = {lang: os.path.join(BASE_PATH, "dict", lang + ".txt") for lang in languages}
+            converter = CTCLabelConverter(reader.character, {}, dict_list)
+            model = importlib.import_module(cached["module"]).Model(num_class=len(converter.character), **network)
+            model.load_state_dict(cached["state_dict"], assign=True)
+            reader.recognizer, reader.converter = _quantize(torch, model), converter
+            phases["load_weights"] = time.perf_counter() - started
+            return reader, "warm", phases
+        except Exception as e:
+            logger.warning(f"⚠️ OCR model cache unusable ({e}); rebuilding {rec_path}")
+
+    started = time.perf_counter()
+    # Quantized on CPU below, once the float weights have been cached
+    reader = easyocr.Reader(list(languages), gpu=gpu, detector=detector, quantize=False, verbose=False)
+    phases["construct"] = time.perf_counter() - started
+
+    if not gpu:
+        started = time.perf_counter()
+        try:
+            if detector:
+                _save(torch, reader.detector.state_dict(), det_path)
+            _save(torch, {"module": type(reader.recognizer).__module__,
+                          "state_dict": reader.recognizer.state_dict()}, rec_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write OCR model cache: {e}")
+        phases["serialize"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if detector:
+            _quantize(torch, reader.detector)
+        _quantize(torch, reader.recognizer)
+        phases["quantize"] = time.perf_counter() - started
+    return reader, "cold", phases
+
+
+def warm_up(reader) -> float:
+    """Run one tiny inference so lazy kernel setup doesn't land on the first real request."""
+    import numpy as np
+    img = np.full((64, 320, 3), 255, dtype=np.uint8)
+    img[24:40, 16:300] = 0
+    started = time.perf_counter()
+    reader.readtext(img, detail=0)
+    return time.perf_counter() - started
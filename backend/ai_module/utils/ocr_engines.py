@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# One recognized line: text, confidence in [0, 1] and (x0, y0, x1, y1) box in pixels
+OCRLine = namedtuple("OCRLine", ["text", "confidence", "box"])
+
+# EasyOCR language code -> Tesseract traineddata name
+TESSERACT_LANGUAGES = {
+    "en": "eng", "es": "spa", "fr": "fra", "de": "deu", "it": "ita", "pt": "por",
+    "ru": "rus", "ar": "ara", "hi": "hin", "ch_sim": "chi_sim", "ch_tra": "chi_tra",
+    "ja": "jpn", "ko": "kor", "th": "tha", "vi": "vie", "id": "ind", "nl": "nld",
+    "pl": "pol", "tr": "tur", "uk": "ukr", "fa": "fas",
+}
+
+
+def tesseract_available() -> bool:
+    """True when pytesseract is installed and can run the tesseract binary."""
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        logger.warning(f"⚠️ pytesseract is installed but tesseract is not usable: {e}")
+        return False
+    return True
+
+
+class EngineStats:
+    """Thread-safe call count and latency totals for one OCR engine."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.total_seconds += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_ms": round(1000 * self.total_seconds / self.calls, 1) if self.calls else 0.0,
+            }
+
+
+class OCREngine:
+    """
+    Interface for OCR backends used by OCRExtractor.
+    ``read_lines`` takes an RGB array and an EasyOCR-style language group.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.stats = EngineStats()
+
+    def read_lines(self, img: np.ndarray, languages: Sequence[str]) -> List[OCRLine]:
+        started = time.perf_counter()
+        try:
+            lines = self._read(img, languages)
+        except Exception:
+            self.stats.record(time.perf_counter() - started, error=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return lines
+
+    def _read(self, img: np.ndarray, languages: Sequence[str]) -> List[OCRLine]:
+        raise NotImplementedError
+
+    def recognize_boxes(self, img: np.ndarray, boxes: Sequence[tuple],
+                        languages: Sequence[str]) -> List[Optional[OCRLine]]:
+        """
+        Re-read known (x0, y0, x1, y1) line boxes without running detection.
+        Returns one entry per box, None where nothing was recognized.
+        """
+        started = time.perf_counter()
+        try:
+            lines = self._recognize(img, boxes, languages)
+        except Exception:
+            self.stats.record(time.perf_counter() - started, error=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return lines
+
+    def _recognize(self, img: np.ndarray, boxes: Sequence[tuple],
+                   languages: Sequence[str]) -> List[Optional[OCRLine]]:
+        # Generic path: read each crop on its own
+        out = []
+        for x0, y0, x1, y1 in boxes:
+            crop = img[y0:y1, x0:x1]
+            redo = self._read(crop, languages) if crop.size else []
+            out.append(OCRLine(" ".join(r.text for r in redo), min(r.confidence for r in redo),
+                               (x0, y0, x1, y1)) if redo else None)
+        return out
+
+    def report(self) -> dict:
+        return {self.name: self.stats.as_dict()}
+
+
+class EasyOCREngine(OCREngine):
+    name = "easyocr"
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    def _read(self, img: np.ndarray, languages: Sequence[str]) -> List[OCRLine]:
+        lines = []
+        for points, text, conf in self.pool.get(languages).readtext(img, detail=1):
+            xs, ys = [p[0] for p in points], [p[1] for p in points]
+            lines.append(OCRLine(text, float(conf), (int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys)))))
+        return lines
+
+    def _recognize(self, img: np.ndarray, boxes: Sequence[tuple],
+                   languages: Sequence[str]) -> List[Optional[OCRLine]]:
+        # One recognizer-only pass over every box; CRAFT detection is skipped.
+        # EasyOCR reports each box by its top-left corner, which maps results back.
+        results = self.pool.get(languages).recognize(
+            img, horizontal_list=[[x0, x1, y0, y1] for x0, y0, x1, y1 in boxes],
+            free_list=[], detail=1)
+        by_corner = {}
+        for points, text, conf in results:
+            by_corner[(int(points[0][0]), int(points[0][1]))] = (text, float(conf))
+        out = []
+        for box in boxes:
+            hit = by_corner.get((box[0], box[1]))
+            out.append(OCRLine(hit[0], hit[1], box) if hit and hit[0].strip() else None)
+        return out
+
+
+class TesseractEngine(OCREngine):
+    name = "tesseract"
+
+    def __init__(self, config: str = ""):
+        super().__init__()
+        if pytesseract is None:
+            raise RuntimeError("pytesseract is not installed")
+        self.config = config
+
+    def _read(self, img: np.ndarray, languages: Sequence[str]) -> List[OCRLine]:
+        unmapped = [code for code in languages if code not in TESSERACT_LANGUAGES]
+        if unmapped:
+            # TieredOCREngine escalates the whole image to EasyOCR on this
+            raise ValueError(f"No Tesseract language data mapped for: {', '.join(unmapped)}")
+        lang = "+".join(TESSERACT_LANGUAGES[code] for code in languages)
+        data = pytesseract.image_to_data(img, lang=lang, config=self.config,
+                                         output_type=pytesseract.Output.DICT)
+        grouped = {}
+        for i, word in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not word.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            box = (data["left"][i], data["top"][i],
+                   data["left"][i] + data["width"][i], data["top"][i] + data["height"][i])
+            grouped.setdefault(key, []).append((word, conf / 100.0, box))
+
+        lines = []
+        for words in grouped.values():
+            boxes = [b for _, _, b in words]
+            lines.append(OCRLine(
+                " ".join(w for w, _, _ in words),
+                min(c for _, c, _ in words),
+                (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                 max(b[2] for b in boxes), max(b[3] for b in boxes)),
+            ))
+        lines.sort(key=lambda line: (line.box[1], line.box[0]))
+        return lines
+
+
+class TieredOCREngine(OCREngine):
+    """
+    Fast engine first; lines below ``min_confidence`` are re-read by the
+    fallback engine in one batched pass over their (padded) boxes. The whole
+    image escalates when the fast engine fails, finds nothing, or more than
+    ``max_low_share`` of its lines are low-confidence.
+    """
+    name = "tiered"
+
+    def __init__(self, fast: OCREngine, fallback: OCREngine, min_confidence: float = 0.75,
+                 padding: int = 4, max_low_share: float = 0.5):
+        super().__init__()
+        self.fast = fast
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.padding = padding
+        self.max_low_share = max_low_share
+        self.images = 0
+        self.images_escalated = 0
+        self.images_touching_fallback = 0
+        self.lines = 0
+        self.lines_escalated = 0
+        self._lock = threading.Lock()
+
+    def _read(self, img: np.ndarray, languages: Sequence[str]) -> List[OCRLine]:
+        try:
+            lines = self.fast.read_lines(img, languages)
+        except Exception as e:
+            logger.warning(f"⚠️ {self.fast.name} OCR failed, escalating image: {e}")
+            lines = []
+
+        if not lines:
+            self._count(escalated_image=True)
+            return self.fallback.read_lines(img, languages)
+
+        low = [i for i, line in enumerate(lines) if line.confidence < self.min_confidence]
+        if len(low) > self.max_low_share * len(lines):
+            self._count(lines=len(lines), escalated_lines=len(low), escalated_image=True)
+            return self.fallback.read_lines(img, languages)
+
+        out = list(lines)
+        if low:
+            height, width = img.shape[:2]
+            boxes = []
+            for i in low:
+                x0, y0, x1, y1 = lines[i].box
+                boxes.append((max(0, x0 - self.padding), max(0, y0 - self.padding),
+                              min(width, x1 + self.padding), min(height, y1 + self.padding)))
+            for i, redo in zip(low, self.fallback.recognize_boxes(img, boxes, languages)):
+                if redo is not None:
+                    out[i] = OCRLine(redo.text, redo.confidence, lines[i].box)
+
+        self._count(lines=len(lines), escalated_lines=len(low))
+        return out
+
+    def _count(self, lines: int = 0, escalated_lines: int = 0, escalated_image: bool = False) -> None:
+        with self._lock:
+            self.images += 1
+            self.images_escalated += int(escalated_image)
+            self.images_touching_fallback += int(escalated_image or escalated_lines > 0)
+            self.lines += lines
+            self.lines_escalated += escalated_lines
+
+    def report(self) -> dict:
+        with self._lock:
+            tier = {
+                "min_confidence": self.min_confidence,
+                "max_low_share": self.max_low_share,
+                "images": self.images,
+                "image_escalation_rate": round(self.images_escalated / self.images, 3) if self.images else 0.0,
+                "fallback_image_rate": round(self.images_touching_fallback / self.images, 3) if self.images else 0.0,
+                "lines": self.lines,
+                "line_escalation_rate": round(self.lines_escalated / self.lines, 3) if self.lines else 0.0,
+            }
+        return {**self.fast.report(), **self.fallback.report(), self.name: {**self.stats.as_dict(), **tier}}
@@ -1,21 +1,63 @@
-import easyocr
 import io
+import logging
+import os
+import numpy as np
 from PIL import Image
-from typing import Union
+from typing import Optional, Union
+from .ocr_engines import OCREngine, EasyOCREngine, TesseractEngine, TieredOCREngine, tesseract_available
+from .reader_pool import OCRReaderPool
+
+logger = logging.getLogger(__name__)
 
 class OCRExtractor:
-    def __init__(self, languages=None):
-        # English only by default; add 'hi','es',... as needed
-        self.reader = easyocr.Reader(languages or ['en'], gpu=False)
+    def __init__(self, languages=None, pool: Optional[OCRReaderPool] = None,
+                 engine: Optional[OCREngine] = None):
+        # English only by default; other languages load on demand from the pool
+        self.pool = pool or OCRReaderPool(default_languages=languages or ['en'])
+        self.engine = engine or self._default_engine()
+        logger.info(f"🔤 OCR engine: {self.engine.name}")
+
+    def _default_engine(self) -> OCREngine:
+        """
+        OCR_ENGINE selects 'easyocr', 'tesseract' or 'tiered' (Tesseract first,
+        EasyOCR for lines under OCR_TIER_MIN_CONFIDENCE, or the whole image once
+        more than OCR_TIER_MAX_LOW_SHARE of its lines are). Tiered is the default
+        whenever the tesseract binary can be run.
+        """
+        name = os.getenv("OCR_ENGINE") or ("tiered" if tesseract_available() else "easyocr")
+        if name == "easyocr":
+            return EasyOCREngine(self.pool)
+        if name == "tesseract":
+            return TesseractEngine()
+        if name == "tiered":
+            return TieredOCREngine(TesseractEngine(), EasyOCREngine(self.pool),
+                                   min_confidence=float(os.getenv("OCR_TIER_MIN_CONFIDENCE", "0.75")),
+                                   max_low_share=float(os.getenv("OCR_TIER_MAX_LOW_SHARE", "0.5")))
+        raise ValueError(f"Unknown OCR_ENGINE '{name}'")
 
-    def extract_text(self, image: Union[str, Image.Image, bytes]) -> str:
+    @property
+    def reader(self):
+        return self.pool.get()
+
+    def extract_text(self, image: Union[str, Image.Image, bytes], language: Optional[str] = None) -> str:
+        """
+        language: comma separated EasyOCR codes ("ru", "ch_sim"), "auto" to
+        detect the script, or None for the pool's default languages.
+        """
         if isinstance(image, bytes):
-            img = Image.open(io.BytesIO(image))
+            with Image.open(io.BytesIO(image)) as pil:
+                img = np.asarray(pil.convert("RGB"))
         elif isinstance(image, str):
-            img = image  # path is ok for easyocr
+            with Image.open(image) as pil:
+                img = np.asarray(pil.convert("RGB"))
         elif isinstance(image, Image.Image):
-            img = image
+            # engines work on RGB arrays; easyocr alone only accepts JPEG PIL images
+            img = np.asarray(image.convert("RGB"))
         else:
             raise ValueError("image must be path, PIL.Image, or bytes")
-        result = self.reader.readtext(img, detail=0)
-        return "\n".join(result).strip()
+        languages = self.pool.languages_for(img, hint=language)
+        lines = self.engine.read_lines(img, languages)
+        return "\n".join(line.text for line in lines).strip()
+
+    def stats(self) -> dict:
+        return {"engines": self.engine.report(), "readers": self.pool.stats()}
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Sequence, Tuple
+
+from .memory import current_rss
+from .model_cache import import_ocr_stack, load_reader, warm_up
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# Tesseract OSD script name -> EasyOCR language group. EasyOCR only lets some
+# scripts share a recognizer with English, so each group is a valid lang_list.
+SCRIPT_LANGUAGES = {
+    "Latin": ("en",),
+    "Cyrillic": ("ru", "en"),
+    "Arabic": ("ar", "en"),
+    "Devanagari": ("hi", "en"),
+    "Han": ("ch_sim", "en"),
+    "Japanese": ("ja", "en"),
+    "Katakana": ("ja", "en"),
+    "Hiragana": ("ja", "en"),
+    "Hangul": ("ko", "en"),
+    "Thai": ("th", "en"),
+}
+
+
+@lru_cache(maxsize=1)
+def supported_languages() -> FrozenSet[str]:
+    """EasyOCR language codes; empty when EasyOCR is not installed."""
+    try:
+        from easyocr.config import all_lang_list
+    except ImportError:
+        return frozenset()
+    return frozenset(all_lang_list)
+
+
+def _module_bytes(module) -> int:
+    """Bytes held by the plain tensors of a torch module's state dict."""
+    total = 0
+    try:
+        for value in module.state_dict().values():
+            if hasattr(value, "numel"):
+                total += value.numel() * value.element_size()
+    except Exception:
+        pass
+    return total
+
+
+def detect_script(image, min_confidence: float = 1.0) -> Optional[str]:
+    """
+    Cheap script detection with Tesseract's orientation & script pass.
+    Returns None when Tesseract is unavailable or not confident.
+    """
+    if pytesseract is None:
+        return None
+    try:
+        osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        logger.debug(f"Script detection skipped: {e}")
+        return None
+    if float(osd.get("script_conf", 0.0)) < min_confidence:
+        return None
+    return osd.get("script")
+
+
+class OCRReaderPool:
+    """
+    Lazily built EasyOCR readers keyed by language group.
+
+    Every reader shares one CRAFT detection network; only the recognizers are
+    per language. Readers are evicted least-recently-used once their estimated
+    footprint exceeds ``memory_budget_mb`` (``OCR_READER_MEMORY_MB``).
+    """
+
+    # Reader attributes that make up the (language independent) detection stage
+    _DETECTOR_ATTRS = ("detector", "detect_network", "get_detector", "get_textbox")
+
+    def __init__(self, default_languages: Optional[Sequence[str]] = None,
+                 memory_budget_mb: Optional[float] = None, gpu: bool = False):
+        self.default_languages = self.normalize(default_languages or ["en"])
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("OCR_READER_MEMORY_MB", "1024"))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.gpu = gpu
+        self._readers: "OrderedDict[Tuple[str, ...], Tuple[object, int]]" = OrderedDict()
+        self._build_locks: Dict[Tuple[str, ...], threading.Lock] = {}
+        self._detector = None
+        self._detector_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        # language group -> how its reader was loaded and seconds per startup phase
+        self.startup: Dict[str, dict] = {}
+
+    @staticmethod
+    def normalize(languages: Sequence[str]) -> Tuple[str, ...]:
+        langs = sorted({lang.strip() for lang in languages if lang and lang.strip()})
+        return tuple(langs) or ("en",)
+
+    def languages_for(self, image=None, hint: Optional[str] = None) -> Tuple[str, ...]:
+        """
+        Pick the language group for a request: an explicit hint wins,
+        ``"auto"`` runs script detection, anything else uses the default.
+        Raises ValueError for codes EasyOCR does not support.
+        """
+        if hint and hint != "auto":
+            key = self.normalize(hint.split(",") + ["en"])
+            supported = supported_languages()
+            unknown = [lang for lang in key if supported and lang not in supported]
+            if unknown:
+                raise ValueError(f"Unsupported OCR language(s): {', '.join(unknown)[:100]}")
+            return key
+        if hint == "auto" and image is not None:
+            script = detect_script(image)
+            if script in SCRIPT_LANGUAGES:
+                return self.normalize(SCRIPT_LANGUAGES[script])
+        return self.default_languages
+
+    def get(self, languages: Optional[Sequence[str]] = None):
+        key = self.normalize(languages) if languages else self.default_languages
+        with self._lock:
+            entry = self._readers.get(key)
+            if entry is not None:
+                self._readers.move_to_end(key)
+                return entry[0]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Build outside the pool lock so cached languages stay servable meanwhile
+        with build_lock:
+            with self._lock:
+                entry = self._readers.get(key)
+                if entry is not None:
+                    return entry[0]
+            try:
+                reader, size = self._build(key)
+            finally:
+                # Locks only live while a build is in flight, so failed or
+                # evicted groups leave nothing behind
+                with self._lock:
+                    if self._build_locks.get(key) is build_lock:
+                        del self._build_locks[key]
+            with self._lock:
+                self._readers[key] = (reader, size)
+                self._evict(keep=key)
+            return reader
+
+    def _build(self, key: Tuple[str, ...]) -> Tuple[object, int]:
+        started = time.perf_counter()
+        # Import torch/easyocr before the RSS baseline so the first reader isn't billed for them
+        imports = import_ocr_stack()
+        rss_before = current_rss()
+        # Only the first build loads the detector; concurrent builds wait for it
+        with self._detector_lock:
+            shared = self._detector
+            if shared is None:
+                reader, mode, phases = load_reader(key, gpu=self.gpu, detector=True)
+                self._detector = {attr: getattr(reader, attr) for attr in self._DETECTOR_ATTRS
+                                  if hasattr(reader, attr)}
+        if shared is not None:
+            reader, mode, phases = load_reader(key, gpu=self.gpu, detector=False)
+            for attr, value in shared.items():
+                setattr(reader, attr, value)
+        phases.update(imports)
+        rss_delta = current_rss() - rss_before
+        if shared is None:
+            # The detector stays resident for the pool's lifetime; don't bill it to this reader
+            rss_delta -= _module_bytes(reader.detector)
+        size = max(rss_delta, _module_bytes(reader.recognizer))
+        total = time.perf_counter() - started
+        startup = {
+            "mode": mode,
+            "total_s": round(total, 3),
+            "phases_s": {name: round(sec, 3) for name, sec in phases.items()},
+        }
+        with self._lock:
+            self.loads += 1
+            self.startup["+".join(key)] = startup
+        logger.info(f"🔤 OCR reader {'+'.join(key)} loaded ({mode}) in {total:.2f}s "
+                    f"(~{size / 1048576:.0f} MB): {startup['phases_s']}")
+        return reader, size
+
+    def warm_up(self, languages: Optional[Sequence[str]] = None) -> None:
+        """Load a reader and run a throwaway inference through it."""
+        key = self.normalize(languages) if languages else self.default_languages
+        seconds = warm_up(self.get(key))
+        entry = self.startup.get("+".join(key))
+        if entry is not None:
+            entry["phases_s"]["warmup"] = round(seconds, 3)
+
+    def _evict(self, keep: Tuple[str, ...]) -> None:
+        while self.footprint() > self.memory_budget and len(self._readers) > 1:
+            key = next(k for k in self._readers if k != keep)
+            _, size = self._readers.pop(key)
+            self.evictions += 1
+            logger.info(f"🔤 OCR reader {'+'.join(key)} evicted (~{size / 1048576:.0f} MB)")
+
+    def footprint(self) -> int:
+        return sum(size for _, size in self._readers.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": ["+".join(key) for key in self._readers],
+                "footprint_mb": round(self.footprint() / 1048576, 1),
+                "budget_mb": round(self.memory_budget / 1048576, 1),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "startup": self.startup,
+            }
@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+RISK_ORDER = {"Safe": 0, "Unknown": 0, "Low": 1, "Medium": 2, "High": 3}
+
+
+def _row_hashes(img: Image.Image) -> List[bytes]:
+    """
+    Hash every pixel row of a grayscale, lightly quantized copy of the image.
+    Quantizing to 16 gray levels keeps JPEG noise from breaking row equality.
+    """
+    gray = np.asarray(img.convert("L"), dtype=np.uint8) >> 4
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).digest() for row in gray]
+
+
+def _is_blank(img: Image.Image) -> List[bool]:
+    gray = np.asarray(img.convert("L"), dtype=np.uint8) >> 4
+    return list((gray.max(axis=1) - gray.min(axis=1)) == 0)
+
+
+class ScrollOverlap:
+    """
+    Result of comparing two consecutive screenshots of the same conversation.
+
+    ``top``/``bottom`` delimit the scrolling region of the current image (rows
+    outside it are static chrome such as the status bar or message composer),
+    ``shift`` is how many rows the content moved up (negative when the user
+    scrolled back up) and ``new_box`` is the (top, bottom) strip that holds
+    content the previous image did not show.
+    """
+
+    def __init__(self, top: int, bottom: int, shift: Optional[int], new_box: Tuple[int, int]):
+        self.top = top
+        self.bottom = bottom
+        self.shift = shift
+        self.new_box = new_box
+
+    @property
+    def found(self) -> bool:
+        return self.shift is not None
+
+    @property
+    def overlap_rows(self) -> int:
+        if self.shift is None:
+            return 0
+        return max(0, (self.bottom - self.top) - abs(self.shift))
+
+
+def detect_scroll_overlap(prev_rows: List[bytes], cur_rows: List[bytes], cur_blank: List[bool],
+                          min_match: float = 0.9) -> ScrollOverlap:
+    """
+    Find the vertical scroll offset between two screenshots using row hashes.
+
+    Static header/footer rows (identical at the same position in both images)
+    are peeled off first; unique, non-blank rows of the current scrolling
+    region then vote for the offset at which they appear in the previous one.
+    """
+    height = len(cur_rows)
+    if not prev_rows or len(prev_rows) != height:
+        return ScrollOverlap(0, height, None, (0, height))
+
+    top = 0
+    while top < height and prev_rows[top] == cur_rows[top]:
+        top += 1
+    bottom = height
+    while bottom > top and prev_rows[bottom - 1] == cur_rows[bottom - 1]:
+        bottom -= 1
+    if top >= bottom:
+        # Nothing scrolled: the whole frame was already seen
+        return ScrollOverlap(top, bottom, 0, (bottom, bottom))
+
+    prev_index: Dict[bytes, List[int]] = {}
+    for y in range(top, bottom):
+        prev_index.setdefault(prev_rows[y], []).append(y)
+
+    votes: Counter = Counter()
+    for y in range(top, bottom):
+        if cur_blank[y]:
+            continue
+        positions = prev_index.get(cur_rows[y])
+        if positions and len(positions) == 1:
+            votes[positions[0] - y] += 1
+
+    for shift, _ in votes.most_common(3):
+        lo, hi = max(top, top - shift), min(bottom, bottom - shift)
+        if hi - lo <= 0:
+            continue
+        matches = sum(1 for y in range(lo, hi) if prev_rows[y + shift] == cur_rows[y])
+        if matches / (hi - lo) >= min_match:
+            new_box = (hi, bottom) if shift >= 0 else (top, lo)
+            return ScrollOverlap(top, bottom, shift, new_box)
+
+    return ScrollOverlap(top, bottom, None, (0, height))
+
+
+class ScreenshotSession:
+    """
+    Incremental analysis of a series of overlapping scrolling screenshots.
+
+    Each frame is diffed against the previous one so OCR and content analysis
+    only run on the newly revealed strip; the session keeps a stitched
+    transcript and a verdict merged across every analyzed strip.
+    """
+
+    def __init__(self, ocr, analyze_fn: Callable[[str], dict], session_id: Optional[str] = None,
+                 strip_margin: int = 24, language: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.language = language
+        self.ocr = ocr
+        self.analyze_fn = analyze_fn
+        # Extra rows above/below the new strip so a line cut at the seam is re-read whole
+        self.strip_margin = strip_margin
+        self.lines: List[str] = []
+        self.frames = 0
+        self.updated_at = time.time()
+        self._prev_rows: Optional[List[bytes]] = None
+        self._verdict = {"is_harmful": False, "risk_level": "Safe", "categories": {}, "confidence_scores": {}}
+        self._lock = threading.Lock()
+
+    def add_frame(self, img: Image.Image) -> dict:
+        with self._lock:
+            rows = _row_hashes(img)
+            overlap = detect_scroll_overlap(self._prev_rows, rows, _is_blank(img))
+            self.updated_at = time.time()
+
+            top, bottom = overlap.new_box
+            if overlap.found and bottom > top:
+                top, bottom = max(0, top - self.strip_margin), min(img.height, bottom + self.strip_margin)
+            scrolled_up = overlap.found and overlap.shift < 0
+            new_lines: List[str] = []
+            if bottom - top > 0:
+                strip = img.crop((0, top, img.width, bottom))
+                try:
+                    text = self.ocr.extract_text(strip, language=self.language)
+                finally:
+                    strip.close()
+                new_lines = self._drop_seam_lines(
+                    [ln.strip() for ln in text.splitlines() if ln.strip()], prepend=scrolled_up)
+
+            new_text = "\n".join(new_lines)
+            frame_result = self.analyze_fn(new_text) if new_text else None
+            error = frame_result.get("error") if frame_result else None
+            if error:
+                # Keep the previous frame as the baseline so this strip is
+                # OCR'd and analyzed again with the next upload
+                logger.warning(f"⚠️ Session {self.session_id[:8]}: strip analysis failed, frame not committed: {error}")
+            else:
+                self._prev_rows = rows
+                self.frames += 1
+                if scrolled_up:
+                    self.lines[:0] = new_lines
+                else:
+                    self.lines.extend(new_lines)
+                if frame_result:
+                    self._merge_verdict(frame_result)
+
+            logger.info(f"🧩 Session {self.session_id[:8]} frame {self.frames}: "
+                        f"overlap={overlap.overlap_rows} rows, new strip={bottom - top} rows, "
+                        f"{len(new_lines)} new lines")
+
+            return {
+                "session_id": self.session_id,
+                "frame_index": self.frames,
+                "overlap_detected": overlap.found,
+                "overlap_rows": overlap.overlap_rows,
+                "ocr_rows": max(0, bottom - top),
+                "new_text": new_text,
+                "transcript": "\n".join(self.lines),
+                "frame_result": frame_result,
+                **self.verdict(),
+                "error": error,
+            }
+
+    def _drop_seam_lines(self, lines: List[str], prepend: bool, window: int = 6) -> List[str]:
+        """Drop lines re-read from the seam margin that the transcript already holds."""
+        if prepend:
+            seam = set(self.lines[:window])
+            while lines and lines[-1] in seam:
+                lines.pop()
+        else:
+            seam = set(self.lines[-window:])
+            while lines and lines[0] in seam:
+                lines.pop(0)
+        return lines
+
+    def _merge_verdict(self, result: dict) -> None:
+        merged = self._verdict
+        merged["is_harmful"] = merged["is_harmful"] or bool(result.get("is_harmful"))
+        risk = result.get("risk_level", "Safe")
+        if RISK_ORDER.get(risk, 0) > RISK_ORDER.get(merged["risk_level"], 0):
+            merged["risk_level"] = risk
+        for cat, level in (result.get("categories") or {}).items():
+            if RISK_ORDER.get(level, 0) >= RISK_ORDER.get(merged["categories"].get(cat, "Safe"), 0):
+                merged["categories"][cat] = level
+        for cat, score in (result.get("confidence_scores") or {}).items():
+            merged["confidence_scores"][cat] = max(score or 0.0, merged["confidence_scores"].get(cat, 0.0))
+
+    def verdict(self) -> dict:
+        return {
+            "is_harmful": self._verdict["is_harmful"],
+            "risk_level": self._verdict["risk_level"],
+            "categories": dict(self._verdict["categories"]),
+            "confidence_scores": dict(self._verdict["confidence_scores"]),
+        }
+
+
+class ScreenshotSessionStore:
+    """
+    Thread-safe LRU of live screenshot sessions with idle expiry.
+    """
+
+    def __init__(self, ocr, analyze_fn: Callable[[str], dict], max_sessions: int = 256,
+                 ttl_seconds: float = 900.0):
+        self.ocr = ocr
+        self.analyze_fn = analyze_fn
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ScreenshotSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str] = None, language: Optional[str] = None) -> ScreenshotSession:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ScreenshotSession(self.ocr, self.analyze_fn, session_id=session_id, language=language)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            elif language:
+                session.language = language
+            self._sessions.move_to_end(session.session_id)
+            return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for sid in [sid for sid, s in self._sessions.items() if s.updated_at < cutoff]:
+            del self._sessions[sid]
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Offline bulk moderation for chat exports and screenshot folders.
+
+    python bulk_moderate.py export.jsonl results.jsonl
+    python bulk_moderate.py export.csv results.jsonl --text-field message --id-field msg_id
+    python bulk_moderate.py screenshots/ results.jsonl --ocr-workers 8 --concurrency 16
+
+Input is streamed; OCR runs in a process pool and content safety calls run
+with bounded concurrency. Results are appended to the output JSONL in input
+order and progress is checkpointed next to it (<output>.checkpoint), so
+re-running the same command after a crash resumes where it stopped.
+Items whose moderation failed are kept as rows with "error" set; add
+--retry-errors to re-run just those and rewrite their rows in place.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger("bulk_moderate")
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+
+_worker_ocr = None
+
+
+def _init_ocr_worker(languages, torch_threads):
+    global _worker_ocr
+    # Each worker gets its share of the cores instead of torch's default of all of them
+    import torch
+    torch.set_num_threads(torch_threads)
+    from ai_module.utils.ocr_extractor import OCRExtractor
+    _worker_ocr = OCRExtractor(languages=languages)
+
+
+def _ocr_file(path: str) -> str:
+    from PIL import Image
+    with open(path, "rb") as f:
+        raw = f.read()
+    with Image.open(io.BytesIO(raw)) as img:
+        return _worker_ocr.extract_text(img)
+
+
+def iter_items(source: str, text_field: str, id_field: str):
+    """
+    Yield (id, kind, payload) without loading the whole input. A malformed
+    JSONL line yields kind "error" with the reason as payload, so one bad
+    line costs one error row rather than the whole job.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield name, "image", os.path.join(source, name)
+    elif source.endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            for n, row in enumerate(csv.DictReader(f)):
+                yield row.get(id_field, n), "text", row.get(text_field) or ""
+    else:
+        with open(source, encoding="utf-8") as f:
+            for n, line in enumerate(f):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield n, "error", f"Malformed JSON on line {n + 1}: {e}"
+                    continue
+                if not isinstance(row, dict):
+                    yield n, "error", f"Line {n + 1} is not a JSON object"
+                    continue
+                yield row.get(id_field, n), "text", row.get(text_field) or ""
+
+
+def failed_indices(path: str) -> set:
+    """Indices of output rows whose moderation failed; malformed input rows are not retryable."""
+    failed = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if row.get("error") and row.get("kind") != "error":
+                failed.add(row["index"])
+    return failed
+
+
+def replace_rows(path: str, rows: dict) -> int:
+    """Atomically rewrite ``path`` with ``rows`` (index -> row) swapped in; returns the new size."""
+    tmp = f"{path}.tmp"
+    with open(path, encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        for line in src:
+            index = json.loads(line)["index"]
+            dst.write(json.dumps(rows[index], ensure_ascii=False) + "\n" if index in rows else line)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def _analyzer(method: str):
+    if method == "enhanced":
+        from ai_module.content_detector import ContentDetector
+        return ContentDetector().analyze_content
+    from ai_module.text_analyzer import TextAnalyzer
+    return TextAnalyzer().analyze
+
+
+class Checkpoint:
+    """Number of items committed to the output and the output size at that point."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed = 0
+        self.output_bytes = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.completed, self.output_bytes = data["completed"], data["output_bytes"]
+
+    def save(self, completed: int, output_bytes: int) -> None:
+        self.completed, self.output_bytes = completed, output_bytes
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"completed": completed, "output_bytes": output_bytes, "updated": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="JSONL or CSV file, or a folder of screenshots")
+    parser.add_argument("output", help="results JSONL (appended to when resuming)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--method", choices=("enhanced", "original"), default="enhanced",
+                        help="ContentDetector (enhanced) or TextAnalyzer (original) decisions")
+    parser.add_argument("--concurrency", type=int, default=8, help="content safety calls in flight")
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--languages", default="en", help="comma separated OCR languages")
+    parser.add_argument("--window", type=int, default=512, help="items in flight before output is committed")
+    parser.add_argument("--checkpoint-every", type=int, default=200)
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="after the main pass, re-run items whose rows have an error set")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    analyze = _analyzer(args.method)
+
+    checkpoint = Checkpoint(f"{args.output}.checkpoint")
+    if checkpoint.completed:
+        logger.info(f"↩️ Resuming after {checkpoint.completed} items")
+    if checkpoint.output_bytes and (not os.path.exists(args.output)
+                                    or os.path.getsize(args.output) < checkpoint.output_bytes):
+        logger.error(f"❌ {args.output} is missing or shorter than its checkpoint; "
+                     f"remove the checkpoint to start over")
+        return 1
+    out = open(args.output, "ab")
+    # Drop rows written after the last checkpoint; they are redone below
+    out.truncate(checkpoint.output_bytes)
+    out.seek(checkpoint.output_bytes)
+
+    ocr_pool = None
+    if os.path.isdir(args.source):
+        # spawn, not fork: workers start lazily from runner threads, and forking a
+        # multithreaded process can inherit held logging / SDK locks
+        torch_threads = max(1, (os.cpu_count() or 1) // args.ocr_workers)
+        ocr_pool = ProcessPoolExecutor(max_workers=args.ocr_workers, initializer=_init_ocr_worker,
+                                       initargs=(args.languages.split(","), torch_threads),
+                                       mp_context=multiprocessing.get_context("spawn"))
+    azure_slots = threading.BoundedSemaphore(args.concurrency)
+    runners = ThreadPoolExecutor(max_workers=args.concurrency + args.ocr_workers * 2)
+
+    def moderate(index, item_id, kind, payload):
+        row = {"index": index, "id": item_id, "kind": kind}
+        try:
+            if kind == "error":
+                logger.error(f"❌ Item {index} skipped: {payload}")
+                row["error"] = payload
+                return row
+            if kind == "image":
+                row["source"] = payload
+                text = ocr_pool.submit(_ocr_file, payload).result()
+                row["ocr_text"] = text
+            else:
+                text = payload
+            with azure_slots:
+                result = analyze(text)
+            for key in ("is_harmful", "risk_level", "categories", "confidence_scores", "error"):
+                row[key] = result.get(key)
+        except Exception as e:
+            logger.error(f"❌ Item {index} ({item_id}) failed: {e}")
+            row["error"] = str(e)
+        return row
+
+    done = checkpoint.completed
+    started, pending = time.time(), deque()
+
+    def commit(future):
+        nonlocal done
+        out.write((json.dumps(future.result(), ensure_ascii=False) + "\n").encode("utf-8"))
+        done += 1
+        if done % args.checkpoint_every == 0:
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint.save(done, out.tell())
+            rate = (done - initial) / max(time.time() - started, 1e-9)
+            logger.info(f"📦 {done} items committed ({rate:.1f} items/s)")
+
+    initial = done
+    try:
+        for index, (item_id, kind, payload) in enumerate(iter_items(args.source, args.text_field, args.id_field)):
+            if index < checkpoint.completed:
+                continue
+            pending.append(runners.submit(moderate, index, item_id, kind, payload))
+            while len(pending) >= args.window:
+                commit(pending.popleft())
+        while pending:
+            commit(pending.popleft())
+
+        if args.retry_errors:
+            out.flush()
+            failed = failed_indices(args.output)
+            logger.info(f"🔁 Retrying {len(failed)} failed items")
+            retried = {}
+            for index, (item_id, kind, payload) in enumerate(iter_items(args.source, args.text_field, args.id_field)):
+                if index in failed:
+                    pending.append(runners.submit(moderate, index, item_id, kind, payload))
+                while len(pending) >= args.window:
+                    row = pending.popleft().result()
+                    retried[row["index"]] = row
+            while pending:
+                row = pending.popleft().result()
+                retried[row["index"]] = row
+            if retried:
+                out.close()
+                try:
+                    replace_rows(args.output, retried)
+                finally:
+                    out = open(args.output, "ab")
+            logger.info(f"🔁 {sum(1 for row in retried.values() if row.get('error'))} items still failing")
+    finally:
+        out.flush()
+        os.fsync(out.fileno())
+        checkpoint.save(done, out.tell())
+        out.close()
+        runners.shutdown(wait=False, cancel_futures=True)
+        if ocr_pool is not None:
+            ocr_pool.shutdown(wait=False, cancel_futures=True)
+
+    logger.info(f"✅ {done} items moderated, {done - initial} in this run "
+                f"({(done - initial) / max(time.time() - started, 1e-9):.1f} items/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Memory soak test for the screenshot path.
+
+Runs the same decode -> OCR -> analysis steps as /analyze/screenshot thousands
+of times in-process and fails (exit code 1) when RSS grows more than
+--max-growth-mb after the warm-up iterations.
+
+    python memory_soak.py --iterations 5000 --max-growth-mb 64
+    python memory_soak.py --image sample.png --analyze
+"""
+import argparse
+import gc
+import io
+import logging
+import random
+import sys
+
+from PIL import Image, ImageDraw
+
+from ai_module.utils.memory import MemoryAccountant, current_rss
+from ai_module.utils.ocr_extractor import OCRExtractor
+
+WORDS = "hey are you coming tonight lol no way that is so funny see you at school tomorrow ok".split()
+
+
+def synthetic_screenshot(seed: int) -> bytes:
+    """A plain chat-like screenshot with a few bubbles of random words."""
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (720, 1280), "white")
+    draw = ImageDraw.Draw(img)
+    y = 40
+    while y < 1200:
+        x = 40 if rnd.random() < 0.5 else 300
+        draw.rectangle((x - 10, y - 8, x + 380, y + 40), fill=(225, 235, 250))
+        draw.text((x, y), " ".join(rnd.choice(WORDS) for _ in range(6)), fill="black")
+        y += 80
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    img.close()
+    return buf.getvalue()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="screenshot to analyze (default: synthetic chat screenshots)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50, help="iterations before the RSS baseline is taken")
+    parser.add_argument("--max-growth-mb", type=float, default=64.0)
+    parser.add_argument("--report-every", type=int, default=250)
+    parser.add_argument("--analyze", action="store_true", help="also run ContentDetector (calls Azure)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    detector = None
+    if args.analyze:
+        from ai_module.content_detector import default_detector
+        detector = default_detector
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            images = [f.read()]
+    else:
+        images = [synthetic_screenshot(seed) for seed in range(8)]
+
+    ocr = OCRExtractor(languages=["en"])
+    memory = MemoryAccountant()
+    baseline = None
+
+    print(f"🧪 Soaking screenshot path for {args.iterations} iterations")
+    for i in range(1, args.iterations + 1):
+        mem = memory.start("soak")
+        with mem.stage("decode"):
+            img = Image.open(io.BytesIO(images[i % len(images)]))
+            img.load()
+        with img:
+            with mem.stage("ocr"):
+                text = ocr.extract_text(img)
+        if detector is not None and text:
+            with mem.stage("analyze"):
+                detector.analyze_content(text)
+        memory.finish(mem)
+
+        if i == args.warmup:
+            gc.collect()
+            baseline = current_rss()
+            print(f"📏 Baseline after {i} warm-up iterations: {baseline / 1048576:.1f} MB")
+        if i % args.report_every == 0:
+            growth = (current_rss() - baseline) / 1048576 if baseline else 0.0
+            print(f"  {i:>6}: RSS {current_rss() / 1048576:.1f} MB (growth {growth:+.1f} MB)")
+
+    gc.collect()
+    growth = (current_rss() - (baseline or memory.rss_at_start)) / 1048576
+    stages = memory.report(recent=0)["routes"].get("soak", {})
+    for name, agg in stages.items():
+        print(f"  stage {name:<8} avg RSS delta {agg['rss_delta_kb_avg']:>8.1f} KB, max {agg['rss_delta_kb_max']} KB, "
+              f"peak {agg['rss_peak_kb_max']} KB")
+
+    if growth > args.max_growth_mb:
+        print(f"❌ RSS grew {growth:.1f} MB (limit {args.max_growth_mb} MB)")
+        return 1
+    print(f"✅ RSS grew {growth:.1f} MB (limit {args.max_growth_mb} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+On-demand statistical profiling for the Trustify API.
+
+Profiling is off unless PROFILING_TOKEN is set. Requests are profiled when an
+admin arms a route for the next N requests or when a request carries
+``X-Trustify-Profile: <token>``. While at least one profiled request is in
+flight a sampler thread snapshots every thread's stack; stacks that pass
+through the profiled route's endpoint on behalf of a profiled request are
+folded per route. Results are served as collapsed stacks (flamegraph.pl /
+speedscope input) and top-function tables.
+"""
+import contextvars
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-trustify-profile"
+# The profiler's own endpoints carry the token header too; never profile them
+ADMIN_PREFIX = "/admin/profile"
+
+# Set for the lifetime of a profiled request; sync handlers see it too, as the
+# threadpool runs them in a copy of the request's context
+_profiled_request = contextvars.ContextVar("trustify_profiled_request", default=None)
+
+
+def _running_context(frame) -> Optional[contextvars.Context]:
+    """
+    The contextvars.Context a thread's stack runs in. Threadpool workers and
+    asyncio handles both call into it with Context.run, from a frame holding
+    it as ``context`` or ``self._context``.
+    """
+    while frame is not None:
+        f_locals = frame.f_locals
+        ctx = f_locals.get("context")
+        if not isinstance(ctx, contextvars.Context):
+            ctx = getattr(f_locals.get("self"), "_context", None)
+        if isinstance(ctx, contextvars.Context):
+            return ctx
+        frame = frame.f_back
+    return None
+
+
+def _label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RouteProfile:
+    """Folded stacks collected for one route."""
+
+    def __init__(self):
+        self.armed = 0
+        self.requests = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def folded(self, focus: Optional[str] = None) -> Counter:
+        """Collapsed stacks, optionally re-rooted at the first frame whose name contains ``focus``."""
+        if not focus:
+            return self.stacks
+        out: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            for i, frame in enumerate(frames):
+                if focus in frame:
+                    out[";".join(frames[i:])] += count
+                    break
+        return out
+
+    def top(self, focus: Optional[str] = None, limit: int = 30) -> list:
+        folded = self.folded(focus)
+        total = sum(folded.values()) or 1
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for stack, count in folded.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                cumulative[frame] += count
+        return [
+            {
+                "function": frame,
+                "self_pct": round(100 * own[frame] / total, 1),
+                "total_pct": round(100 * samples / total, 1),
+                "samples": samples,
+            }
+            for frame, samples in cumulative.most_common(limit)
+        ]
+
+
+class ProfileController:
+    """Tracks armed routes and in-flight profiled requests and owns the sampler thread."""
+
+    def __init__(self, app, token: Optional[str] = None, interval: float = 0.005):
+        self.app = app
+        self.token = token.encode() if token else None
+        self.interval = interval
+        self.routes: Dict[str, RouteProfile] = {}
+        # in-flight profiled request handle -> (route, endpoint code)
+        self._active: Dict[object, tuple] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, app) -> "ProfileController":
+        return cls(app, token=os.getenv("PROFILING_TOKEN") or None,
+                   interval=float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000)
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def authorized(self, token: Optional[bytes]) -> bool:
+        return self.token is not None and token is not None and hmac.compare_digest(token, self.token)
+
+    def arm(self, route: str, requests: int) -> RouteProfile:
+        with self._lock:
+            profile = self.routes.setdefault(route, RouteProfile())
+            profile.armed += requests
+            return profile
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+
+    def _endpoint(self, scope):
+        for route in self.app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL and hasattr(route, "endpoint"):
+                return route.path, route.endpoint.__code__
+        return None, None
+
+    def begin(self, scope) -> Optional[tuple]:
+        """Decide whether this request is profiled; returns a handle for ``end``."""
+        if scope.get("path", "").startswith(ADMIN_PREFIX):
+            return None
+        requested = any(k == PROFILE_HEADER and self.authorized(v) for k, v in scope.get("headers", []))
+        if not requested and not any(p.armed > 0 for p in list(self.routes.values())):
+            return None
+        route, code = self._endpoint(scope)
+        if code is None:
+            return None
+        with self._lock:
+            profile = self.routes.get(route)
+            if not requested and (profile is None or profile.armed <= 0):
+                return None
+            profile = self.routes.setdefault(route, RouteProfile())
+            if not requested:
+                profile.armed -= 1
+            handle = object()
+            self._active[handle] = (route, code)
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, name="trustify-profiler", daemon=True)
+                self._sampler.start()
+        return handle, _profiled_request.set(handle)
+
+    def end(self, handle: tuple) -> None:
+        request, token = handle
+        _profiled_request.reset(token)
+        with self._lock:
+            route, _ = self._active.pop(request)
+            profile = self.routes.get(route)
+            if profile is not None:
+                profile.requests += 1
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                active = dict(self._active)
+            codes = {code for _, code in active.values()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    if frame.f_code in codes:
+                        break
+                    frame = frame.f_back
+                if frame is None:
+                    continue
+                # Only the profiled requests themselves, not their unprofiled neighbours
+                ctx = _running_context(frame)
+                request = ctx.get(_profiled_request) if ctx is not None else None
+                if request not in active:
+                    continue
+                route = active[request][0]
+                folded = ";".join(_label(code) for code in reversed(stack))
+                with self._lock:
+                    profile = self.routes.get(route)
+                    if profile is not None:
+                        profile.stacks[folded] += 1
+                        profile.samples += 1
+            time.sleep(self.interval)
+
+    def flamegraph(self, route: str, focus: Optional[str] = None) -> str:
+        with self._lock:
+            profile = self.routes.get(route)
+            folded = Counter(profile.folded(focus)) if profile else Counter()
+        return "".join(f"{stack} {count}\n" for stack, count in folded.most_common())
+
+    def top(self, route: str, focus: Optional[str] = None, limit: int = 30) -> list:
+        with self._lock:
+            profile = self.routes.get(route)
+            return profile.top(focus, limit) if profile else []
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "interval_ms": self.interval * 1000,
+                "routes": {
+                    route: {"armed": p.armed, "requests": p.requests, "samples": p.samples}
+                    for route, p in self.routes.items()
+                },
+            }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that hands opted-in requests to a ProfileController."""
+
+    def __init__(self, app, controller: ProfileController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            return await self.app(scope, receive, send)
+        handle = self.controller.begin(scope)
+        if handle is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.end(handle)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline throughput and decision-parity runs over a recorded text corpus.
+
+Record once (needs Azure credentials and network):
+    python replay_bench.py corpus.txt --record
+
+Then replay on any machine, with recorded latencies or none at all:
+    python replay_bench.py corpus.txt --latency none --write-decisions before.jsonl
+    # ...change thresholds or analyzer code...
+    python replay_bench.py corpus.txt --latency none --baseline before.jsonl
+
+The corpus is one text per line, or JSONL objects with a "text" field when
+it is named *.jsonl / *.ndjson or --jsonl is passed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def read_corpus(path: str, jsonl: bool = False):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            yield json.loads(line)["text"] if jsonl else line
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus")
+    parser.add_argument("--jsonl", action="store_true", help="corpus lines are JSON objects with a \"text\" field")
+    parser.add_argument("--cassette", default="content_safety_cassette.sqlite")
+    parser.add_argument("--record", action="store_true", help="call Azure and record responses")
+    parser.add_argument("--latency", default="recorded", help="replay latency: recorded, none or milliseconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--baseline", help="decisions JSONL from an earlier run to compare against")
+    parser.add_argument("--write-decisions", help="write this run's decisions as JSONL")
+    args = parser.parse_args()
+
+    # Provider mode must be set before the analyzers build their providers
+    os.environ["CONTENT_SAFETY_MODE"] = "record" if args.record else "replay"
+    os.environ["CONTENT_SAFETY_CASSETTE"] = args.cassette
+    os.environ["CONTENT_SAFETY_REPLAY_LATENCY"] = args.latency
+    from ai_module.text_analyzer import TextAnalyzer
+    from ai_module.content_detector import ContentDetector
+
+    analyzer, detector = TextAnalyzer(), ContentDetector()
+    jsonl = args.jsonl or args.corpus.endswith((".jsonl", ".ndjson"))
+    texts = list(read_corpus(args.corpus, jsonl=jsonl))
+
+    def run(text):
+        # One provider call (and one cassette row) per text; both decisions come from it
+        try:
+            response = detector.provider.analyze_text(text.strip())
+        except Exception as e:
+            response = {"error": f"Analysis failed: {e}"}
+        original = analyzer.from_response(response)
+        enhanced = detector.from_response(text, response)
+        return {
+            "text": text,
+            "original": {"is_harmful": original["is_harmful"], "risk_level": original["risk_level"]},
+            "enhanced": {"is_harmful": enhanced["is_harmful"], "risk_level": enhanced["risk_level"]},
+            "error": original.get("error") or enhanced.get("error"),
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        decisions = list(pool.map(run, texts))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(1 for d in decisions if d["error"])
+    disagree = sum(1 for d in decisions if d["original"]["is_harmful"] != d["enhanced"]["is_harmful"])
+    print(f"📼 {len(texts)} texts in {elapsed:.2f}s ({len(texts) / elapsed:.1f} texts/s, "
+          f"concurrency {args.concurrency}, mode {os.environ['CONTENT_SAFETY_MODE']})")
+    print(f"  errors / missing from cassette: {errors}")
+    print(f"  original vs enhanced disagreements: {disagree}")
+
+    if args.write_decisions:
+        with open(args.write_decisions, "w", encoding="utf-8") as f:
+            for d in decisions:
+                f.write(json.dumps(d, separators=(",", ":")) + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            before = {d["text"]: d for d in map(json.loads, f)}
+        changed = [
+            d for d in decisions
+            if d["text"] in before and (d["original"] != before[d["text"]]["original"]
+                                        or d["enhanced"] != before[d["text"]]["enhanced"])
+        ]
+        print(f"  decisions changed vs baseline: {len(changed)} of {len(decisions)}")
+        for d in changed[:20]:
+            print(f"    - {d['text'][:80]!r}: {before[d['text']]['enhanced']} -> {d['enhanced']}")
+        return 1 if changed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
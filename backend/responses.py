@@ -0,0 +1,72 @@
+"""
+Typed response contracts and fast serialization for the /analyze/* routes.
+
+Callers pick how much they get back with ``verbosity``:
+  minimal  - the verdict only (ok, is_harmful, risk_level, error)
+  standard - verdict plus categories and request metadata
+  full     - everything, including OCR text, scores and summaries (default)
+or list exact top-level keys with ``fields`` ("is_harmful,risk_level").
+
+Payloads are validated through the model for the requested verbosity and
+serialized with orjson when it is installed, bypassing FastAPI's generic
+jsonable_encoder walk.
+"""
+from typing import Any, Dict, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+try:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    import orjson  # noqa: F401  (ORJSONResponse imports it lazily)
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+
+Verbosity = Literal["minimal", "standard", "full"]
+
+
+class VerdictResponse(BaseModel):
+    ok: bool
+    is_harmful: bool = False
+    risk_level: str = "Safe"
+    error: Optional[str] = None
+
+
+class StandardAnalysisResponse(VerdictResponse):
+    input_kind: str
+    analysis_method: str
+    provider: str = "azure"
+    categories: Dict[str, str] = {}
+    text_length: Optional[int] = None
+    session_id: Optional[str] = None
+
+
+class FullAnalysisResponse(StandardAnalysisResponse):
+    model_config = ConfigDict(extra="allow")
+
+    confidence_scores: Dict[str, float] = {}
+    analysis_summary: Optional[str] = None
+    ocr_text: Optional[str] = None
+    transcript: Optional[str] = None
+    frame_result: Optional[Dict[str, Any]] = None
+
+
+VERBOSITY_MODELS = {
+    "minimal": VerdictResponse,
+    "standard": StandardAnalysisResponse,
+    "full": FullAnalysisResponse,
+}
+
+# Declared response_model of the /analyze/* routes; the shape follows ``verbosity``
+AnalysisResponse = Union[FullAnalysisResponse, StandardAnalysisResponse, VerdictResponse]
+
+
+def shape_response(payload: dict, verbosity: Verbosity = "full", fields: Optional[str] = None):
+    """Build ``payload`` through the model for ``verbosity`` (or trim it to ``fields``) and serialize it."""
+    if fields:
+        keep = {f.strip() for f in fields.split(",") if f.strip()} | {"ok"}
+        data = FullAnalysisResponse.model_validate(payload).model_dump(include=keep, exclude_unset=True)
+    else:
+        # Minimal and standard drop unknown keys; full keeps them (extra="allow")
+        data = VERBOSITY_MODELS[verbosity].model_validate(payload).model_dump(
+            exclude_unset=True, exclude_none=verbosity != "full")
+    return FastJSONResponse(data)
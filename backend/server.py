@@ -1,13 +1,22 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from typing import Optional
 from ai_module.text_analyzer import default_analyzer, analyze_text
 from ai_module.content_detector import default_detector, detect_harmful_content
-from ai_module.providers.azure_client import AzureContentSafetyProvider
+from ai_module.providers.factory import create_provider
 from ai_module.utils.ocr_extractor import OCRExtractor
+from ai_module.utils.screenshot_session import ScreenshotSessionStore
+from ai_module.utils.memory import MemoryAccountant
+from admission import AdmissionController, AdmissionMiddleware
+from profiling import ProfileController, ProfilingMiddleware
+from responses import AnalysisResponse, FastJSONResponse, Verbosity, shape_response
 from PIL import Image
 import io
 import logging
 import json
+import os
 
 # Import dashboard endpoints
 try:
@@ -22,7 +31,15 @@ except ImportError:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Trustify Analyzer - Complete Content Safety API", version="2.0.0")
+app = FastAPI(title="Trustify Analyzer - Complete Content Safety API", version="2.0.0",
+              default_response_class=FastJSONResponse)
+# Large OCR transcripts compress well; small verdicts are sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+admission = AdmissionController.from_env()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+profiler = ProfileController.from_env(app)
+memory = MemoryAccountant()
+app.add_middleware(ProfilingMiddleware, controller=profiler)
 
 # Register dashboard endpoints if available
 if DASHBOARD_AVAILABLE:
@@ -112,7 +129,13 @@ if DASHBOARD_AVAILABLE:
 # Initialize components
 try:
     ocr = OCRExtractor(languages=['en'])
-    azure_provider = AzureContentSafetyProvider()
+    # Load the default reader up front; other languages load on demand
+    if os.getenv("OCR_WARMUP", "0") == "1":
+        ocr.pool.warm_up()
+    else:
+        ocr.pool.get()
+    azure_provider = create_provider()
+    screenshot_sessions = ScreenshotSessionStore(ocr, default_detector.analyze_content)
     logger.info("✅ All AI components initialized successfully")
 except Exception as e:
     logger.error(f"❌ Failed to initialize AI components: {e}")
@@ -121,18 +144,21 @@ except Exception as e:
 class TextInput(BaseModel):
     text: str
     debug: bool = False
+    verbosity: Verbosity = "full"
+    fields: Optional[str] = None
 
-class AnalysisResponse(BaseModel):
-    ok: bool
-    input_kind: str
-    provider: str = "azure"
-    analysis_method: str
+def _require_supported_lang(lang: Optional[str]) -> None:
+    """Reject unsupported OCR language hints up front instead of returning a 'Safe' verdict for them"""
+    try:
+        ocr.pool.languages_for(hint=lang)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # ============================================================================
 # ORIGINAL TEXT ANALYZER ENDPOINTS (using text_analyzer.py)
 # ============================================================================
 
-@app.post("/analyze/text", response_model=dict)
+@app.post("/analyze/text", response_model=AnalysisResponse)
 def analyze_text_original(input_data: TextInput):
     """
     Original text analysis using TextAnalyzer (text_analyzer.py)
@@ -148,16 +174,16 @@ def analyze_text_original(input_data: TextInput):
         
         logger.info(f"✅ [ORIGINAL] Text analysis completed: {result.get('risk_level', 'Unknown')} risk, harmful: {result.get('is_harmful', False)}")
         
-        return {
+        return shape_response({
             "ok": True,
             "input_kind": "text",
             "analysis_method": "original_text_analyzer",
             **result
-        }
+        }, input_data.verbosity, input_data.fields)
         
     except Exception as e:
         logger.error(f"❌ [ORIGINAL] Text analysis failed: {str(e)}", exc_info=True)
-        return {
+        return shape_response({
             "ok": False,
             "input_kind": "text",
             "analysis_method": "original_text_analyzer",
@@ -167,26 +193,32 @@ def analyze_text_original(input_data: TextInput):
             "categories": {},
             "confidence_scores": {},
             "provider": "azure"
-        }
+        }, input_data.verbosity, input_data.fields)
 
-@app.post("/analyze/screenshot", response_model=dict)
-async def analyze_screenshot_original(file: UploadFile = File(...)):
+@app.post("/analyze/screenshot", response_model=AnalysisResponse)
+def analyze_screenshot_original(file: UploadFile = File(...), lang: str = Form(None),
+                                verbosity: Verbosity = Form("full"), fields: str = Form(None)):
     """
     Original image analysis using TextAnalyzer + OCR
     """
     logger.info(f"📸 [ORIGINAL] Image analysis request: {file.filename} ({file.content_type})")
     
+    _require_supported_lang(lang)
+    mem = memory.start("/analyze/screenshot")
     try:
-        # Read and process image
-        raw = await file.read()
+        # Read and process image (sync handler: OCR and Azure run in the threadpool)
+        raw = file.file.read()
         logger.info(f"📸 Image data read: {len(raw)} bytes")
         
         # Extract text using OCR
         try:
-            img = Image.open(io.BytesIO(raw))
-            logger.info(f"📸 Image opened: {img.size} pixels, mode: {img.mode}")
-            
-            extracted_text = ocr.extract_text(img)
+            with mem.stage("decode"):
+                img = Image.open(io.BytesIO(raw))
+                img.load()
+            with img:
+                logger.info(f"📸 Image opened: {img.size} pixels, mode: {img.mode}")
+                with mem.stage("ocr"):
+                    extracted_text = ocr.extract_text(img, language=lang)
             logger.info(f"📸 OCR extracted text: '{extracted_text[:200]}...' ({len(extracted_text)} chars)")
             
         except Exception as e:
@@ -195,7 +227,8 @@ async def analyze_screenshot_original(file: UploadFile = File(...)):
         
         # Analyze extracted text using original analyzer
         if extracted_text and not extracted_text.startswith("[OCR Error]"):
-            analysis_result = default_analyzer.analyze(extracted_text)
+            with mem.stage("analyze"):
+                analysis_result = default_analyzer.analyze(extracted_text)
             logger.info(f"✅ [ORIGINAL] Image analysis completed: {analysis_result.get('risk_level', 'Unknown')} risk")
         else:
             logger.warning("⚠️ Using default safe result due to OCR error or no text")
@@ -208,17 +241,17 @@ async def analyze_screenshot_original(file: UploadFile = File(...)):
                 "error": "No text extracted or OCR failed"
             }
         
-        return {
+        return shape_response({
             "ok": True,
             "input_kind": "image",
             "analysis_method": "original_text_analyzer",
             "ocr_text": extracted_text,
             **analysis_result
-        }
+        }, verbosity, fields)
         
     except Exception as e:
         logger.error(f"❌ [ORIGINAL] Screenshot analysis failed: {str(e)}", exc_info=True)
-        return {
+        return shape_response({
             "ok": False,
             "input_kind": "image",
             "analysis_method": "original_text_analyzer",
@@ -229,13 +262,15 @@ async def analyze_screenshot_original(file: UploadFile = File(...)):
             "categories": {},
             "confidence_scores": {},
             "provider": "azure"
-        }
+        }, verbosity, fields)
+    finally:
+        memory.finish(mem)
 
 # ============================================================================
 # ENHANCED CONTENT DETECTOR ENDPOINTS (using content_detector.py)
 # ============================================================================
 
-@app.post("/analyze/text/enhanced", response_model=dict)
+@app.post("/analyze/text/enhanced", response_model=AnalysisResponse)
 def analyze_text_enhanced(input_data: TextInput):
     """
     Enhanced text analysis using ContentDetector (content_detector.py)
@@ -247,16 +282,16 @@ def analyze_text_enhanced(input_data: TextInput):
         result = default_detector.analyze_content(input_data.text, debug=input_data.debug)
         logger.info(f"✅ [ENHANCED] Text analysis completed: {result.get('risk_level', 'Unknown')} risk, harmful: {result.get('is_harmful', False)}")
         
-        return {
+        return shape_response({
             "ok": True,
             "input_kind": "text",
             "analysis_method": "enhanced_content_detector",
             **result
-        }
+        }, input_data.verbosity, input_data.fields)
         
     except Exception as e:
         logger.error(f"❌ [ENHANCED] Text analysis failed: {str(e)}", exc_info=True)
-        return {
+        return shape_response({
             "ok": False,
             "input_kind": "text",
             "analysis_method": "enhanced_content_detector",
@@ -266,26 +301,32 @@ def analyze_text_enhanced(input_data: TextInput):
             "categories": {},
             "confidence_scores": {},
             "provider": "azure"
-        }
+        }, input_data.verbosity, input_data.fields)
 
-@app.post("/analyze/screenshot/enhanced", response_model=dict)
-async def analyze_screenshot_enhanced(file: UploadFile = File(...)):
+@app.post("/analyze/screenshot/enhanced", response_model=AnalysisResponse)
+def analyze_screenshot_enhanced(file: UploadFile = File(...), lang: str = Form(None),
+                                verbosity: Verbosity = Form("full"), fields: str = Form(None)):
     """
     Enhanced image analysis using ContentDetector + OCR
     """
     logger.info(f"📸 [ENHANCED] Image analysis request: {file.filename} ({file.content_type})")
     
+    _require_supported_lang(lang)
+    mem = memory.start("/analyze/screenshot/enhanced")
     try:
-        # Read and process image
-        raw = await file.read()
+        # Read and process image (sync handler: OCR and Azure run in the threadpool)
+        raw = file.file.read()
         logger.info(f"📸 Image data read: {len(raw)} bytes")
         
         # Extract text using OCR
         try:
-            img = Image.open(io.BytesIO(raw))
-            logger.info(f"📸 Image opened: {img.size} pixels, mode: {img.mode}")
-            
-            extracted_text = ocr.extract_text(img)
+            with mem.stage("decode"):
+                img = Image.open(io.BytesIO(raw))
+                img.load()
+            with img:
+                logger.info(f"📸 Image opened: {img.size} pixels, mode: {img.mode}")
+                with mem.stage("ocr"):
+                    extracted_text = ocr.extract_text(img, language=lang)
             logger.info(f"📸 OCR extracted text: '{extracted_text[:200]}...' ({len(extracted_text)} chars)")
             
         except Exception as e:
@@ -294,7 +335,8 @@ async def analyze_screenshot_enhanced(file: UploadFile = File(...)):
         
         # Analyze extracted text using enhanced detector
         if extracted_text and not extracted_text.startswith("[OCR Error]"):
-            analysis_result = default_detector.analyze_content(extracted_text, debug=True)
+            with mem.stage("analyze"):
+                analysis_result = default_detector.analyze_content(extracted_text, debug=True)
             logger.info(f"✅ [ENHANCED] Image analysis completed: {analysis_result.get('risk_level', 'Unknown')} risk")
         else:
             logger.warning("⚠️ Using default safe result due to OCR error or no text")
@@ -308,17 +350,17 @@ async def analyze_screenshot_enhanced(file: UploadFile = File(...)):
                 "text_length": 0
             }
         
-        return {
+        return shape_response({
             "ok": True,
             "input_kind": "image",
             "analysis_method": "enhanced_content_detector",
             "ocr_text": extracted_text,
             **analysis_result
-        }
+        }, verbosity, fields)
         
     except Exception as e:
         logger.error(f"❌ [ENHANCED] Screenshot analysis failed: {str(e)}", exc_info=True)
-        return {
+        return shape_response({
             "ok": False,
             "input_kind": "image",
             "analysis_method": "enhanced_content_detector",
@@ -329,13 +371,74 @@ async def analyze_screenshot_enhanced(file: UploadFile = File(...)):
             "categories": {},
             "confidence_scores": {},
             "provider": "azure"
-        }
+        }, verbosity, fields)
+    finally:
+        memory.finish(mem)
+
+@app.post("/analyze/screenshot/session", response_model=AnalysisResponse)
+def analyze_screenshot_session(file: UploadFile = File(...), session_id: str = Form(None),
+                               lang: str = Form(None), verbosity: Verbosity = Form("full"),
+                               fields: str = Form(None)):
+    """
+    Incremental analysis for a series of scrolling screenshots of the same chat.
+    Only the strip not seen in the session's previous screenshot is OCR'd and
+    analyzed; the response carries the stitched transcript and merged verdict.
+    """
+    logger.info(f"🧩 [SESSION] Image analysis request: {file.filename} (session: {session_id or 'new'})")
+
+    _require_supported_lang(lang)
+    mem = memory.start("/analyze/screenshot/session")
+    try:
+        # Sync handler: FastAPI runs it in the threadpool, off the event loop
+        raw = file.file.read()
+        session = screenshot_sessions.get_or_create(session_id, language=lang)
+        with mem.stage("decode"):
+            img = Image.open(io.BytesIO(raw))
+            img.load()
+        with img:
+            logger.info(f"📸 Image opened: {img.size} pixels, mode: {img.mode}")
+            with mem.stage("ocr_and_analyze"):
+                result = session.add_frame(img)
+
+        logger.info(f"✅ [SESSION] Frame analyzed: {result.get('risk_level', 'Unknown')} risk, harmful: {result.get('is_harmful', False)}")
+
+        return shape_response({
+            "ok": True,
+            "input_kind": "image",
+            "analysis_method": "screenshot_session",
+            "provider": "azure",
+            "ocr_text": result["new_text"],
+            **result
+        }, verbosity, fields)
+
+    except Exception as e:
+        logger.error(f"❌ [SESSION] Screenshot session analysis failed: {str(e)}", exc_info=True)
+        return shape_response({
+            "ok": False,
+            "input_kind": "image",
+            "analysis_method": "screenshot_session",
+            "session_id": session_id,
+            "error": f"Analysis failed: {str(e)}",
+            "ocr_text": "",
+            "is_harmful": False,
+            "risk_level": "Safe",
+            "categories": {},
+            "confidence_scores": {},
+            "provider": "azure"
+        }, verbosity, fields)
+    finally:
+        memory.finish(mem)
+
+@app.delete("/analyze/screenshot/session/{session_id}")
+def close_screenshot_session(session_id: str):
+    """Drop a screenshot session and its stitched transcript"""
+    return {"ok": screenshot_sessions.close(session_id), "session_id": session_id}
 
 # ============================================================================
 # DIRECT AZURE API ENDPOINTS (using azure_client.py directly)
 # ============================================================================
 
-@app.post("/analyze/text/raw-azure", response_model=dict)
+@app.post("/analyze/text/raw-azure", response_model=AnalysisResponse)
 def analyze_text_raw_azure(input_data: TextInput):
     """
     Direct Azure Content Safety API analysis (raw results)
@@ -350,17 +453,17 @@ def analyze_text_raw_azure(input_data: TextInput):
         
         logger.info(f"✅ [RAW-AZURE] Direct Azure analysis completed: {result.get('risk_level', 'Unknown')} risk")
         
-        return {
+        return shape_response({
             "ok": True,
             "input_kind": "text",
             "analysis_method": "raw_azure_api",
             "provider": "azure",
             **result
-        }
+        }, input_data.verbosity, input_data.fields)
         
     except Exception as e:
         logger.error(f"❌ [RAW-AZURE] Direct Azure analysis failed: {str(e)}", exc_info=True)
-        return {
+        return shape_response({
             "ok": False,
             "input_kind": "text",
             "analysis_method": "raw_azure_api",
@@ -369,7 +472,7 @@ def analyze_text_raw_azure(input_data: TextInput):
             "confidence_scores": {},
             "risk_level": "Safe",
             "provider": "azure"
-        }
+        }, input_data.verbosity, input_data.fields)
 
 # ============================================================================
 # UTILITY AND TESTING ENDPOINTS
@@ -385,6 +488,8 @@ def health_check():
         "components": {
             "azure_provider": "initialized",
             "ocr_extractor": "initialized",
+            "ocr": ocr.stats(),
+            "admission": admission.stats(),
             "text_analyzer": "initialized",
             "content_detector": "initialized"
         }
@@ -442,14 +547,25 @@ def test_azure_connection():
     }
 
 @app.post("/ocr/extract")
-async def extract_text_from_image(file: UploadFile = File(...)):
+def extract_text_from_image(file: UploadFile = File(...), lang: str = Form(None)):
     """Extract text from image using OCR only (no content analysis)"""
     logger.info(f"📸 [OCR-ONLY] Text extraction request: {file.filename}")
     
+    _require_supported_lang(lang)
+    mem = memory.start("/ocr/extract")
     try:
-        raw = await file.read()
-        img = Image.open(io.BytesIO(raw))
-        extracted_text = ocr.extract_text(img)
+        raw = file.file.read()
+        with mem.stage("decode"):
+            img = Image.open(io.BytesIO(raw))
+            img.load()
+        with img:
+            with mem.stage("ocr"):
+                extracted_text = ocr.extract_text(img, language=lang)
+            image_info = {
+                "size": img.size,
+                "mode": img.mode,
+                "format": img.format
+            }
         
         logger.info(f"✅ [OCR-ONLY] Text extracted: '{extracted_text[:100]}...' ({len(extracted_text)} chars)")
         
@@ -458,11 +574,7 @@ async def extract_text_from_image(file: UploadFile = File(...)):
             "service": "ocr_extraction",
             "extracted_text": extracted_text,
             "text_length": len(extracted_text),
-            "image_info": {
-                "size": img.size,
-                "mode": img.mode,
-                "format": img.format
-            }
+            "image_info": image_info
         }
         
     except Exception as e:
@@ -474,6 +586,73 @@ async def extract_text_from_image(file: UploadFile = File(...)):
             "extracted_text": "",
             "text_length": 0
         }
+    finally:
+        memory.finish(mem)
+
+@app.get("/ocr/stats")
+def ocr_stats():
+    """Per-engine OCR latency, tier escalation rates and loaded reader models"""
+    return {"ok": True, "service": "ocr_extraction", **ocr.stats()}
+
+@app.get("/diagnostics/memory")
+def memory_diagnostics(recent: int = 20, top_allocations: int = 0):
+    """
+    Process RSS, per-route/per-stage RSS deltas and sampled RSS peaks, plus
+    Python allocation deltas and top allocation sites with MEMORY_TRACEMALLOC=1
+    """
+    return {"ok": True, **memory.report(recent=recent, top_allocations=top_allocations)}
+
+# ============================================================================
+# PROFILING ENDPOINTS (enabled by PROFILING_TOKEN)
+# ============================================================================
+
+class ProfileArmRequest(BaseModel):
+    route: str
+    requests: int = 10
+
+def _require_profiler(token: str):
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiler.authorized(token.encode() if token else None):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.post("/admin/profile/arm")
+def arm_profiling(body: ProfileArmRequest, x_trustify_profile: str = Header(None)):
+    """Profile the next N requests to a route path (e.g. /analyze/screenshot)"""
+    _require_profiler(x_trustify_profile)
+    profile = profiler.arm(body.route, body.requests)
+    logger.info(f"🔬 Profiling armed for {body.route}: next {profile.armed} requests")
+    return {"ok": True, "route": body.route, "armed": profile.armed}
+
+@app.get("/admin/profile")
+def profiling_status(x_trustify_profile: str = Header(None)):
+    """Armed routes and samples collected so far"""
+    _require_profiler(x_trustify_profile)
+    return {"ok": True, **profiler.status()}
+
+@app.get("/admin/profile/flamegraph", response_class=PlainTextResponse)
+def profiling_flamegraph(route: str, focus: str = None, x_trustify_profile: str = Header(None)):
+    """
+    Collapsed stacks for flamegraph.pl or speedscope. ``focus`` re-roots stacks
+    at a function, e.g. OCRExtractor.extract_text or ContentDetector.analyze_content
+    """
+    _require_profiler(x_trustify_profile)
+    filename = route.strip("/").replace("/", "_") or "root"
+    return PlainTextResponse(profiler.flamegraph(route, focus),
+                             headers={"Content-Disposition": f'attachment; filename="{filename}.folded"'})
+
+@app.get("/admin/profile/top")
+def profiling_top(route: str, focus: str = None, limit: int = 30, x_trustify_profile: str = Header(None)):
+    """Top functions by inclusive samples, with self time"""
+    _require_profiler(x_trustify_profile)
+    return {"ok": True, "route": route, "focus": focus, "functions": profiler.top(route, focus, limit)}
+
+@app.delete("/admin/profile")
+def profiling_reset(x_trustify_profile: str = Header(None)):
+    """Drop all collected profiles"""
+    _require_profiler(x_trustify_profile)
+    profiler.reset()
+    return {"ok": True}
 
 @app.get("/")
 def root():
@@ -488,7 +667,8 @@ def root():
             },
             "enhanced_analysis": {
                 "text": "/analyze/text/enhanced", 
-                "image": "/analyze/screenshot/enhanced"
+                "image": "/analyze/screenshot/enhanced",
+                "image_session": "/analyze/screenshot/session"
             },
             "raw_azure": {
                 "text": "/analyze/text/raw-azure"
@@ -496,7 +676,9 @@ def root():
             "utilities": {
                 "health": "/health",
                 "test": "/test/azure-connection",
-                "ocr": "/ocr/extract"
+                "ocr": "/ocr/extract",
+                "ocr_stats": "/ocr/stats",
+                "memory": "/diagnostics/memory"
             }
         },
         "description": "Complete content safety analysis with multiple detection methods"
@@ -0,0 +1,111 @@
+import asyncio
+
+from admission import AdmissionController, classify
+
+
+def controller(**kwargs):
+    # 8 slots: image capped at 6, batch at 2, two always left for text
+    return AdmissionController(max_concurrent=8, reserved_text=2, **kwargs)
+
+
+def fill(ctl, cls, count):
+    for _ in range(count):
+        assert ctl._can_run(cls)
+        ctl._grant(cls)
+
+
+def test_non_text_cannot_take_reserved_text_slots():
+    ctl = controller()
+    fill(ctl, "image", 5)
+    fill(ctl, "batch", 1)
+    assert not ctl._can_run("image")
+    assert not ctl._can_run("batch")
+    fill(ctl, "text", 2)
+    assert not ctl._can_run("text")
+
+
+def test_per_class_cap():
+    ctl = controller()
+    fill(ctl, "batch", 2)
+    assert not ctl._can_run("batch")
+    assert ctl._can_run("image")
+
+
+def test_text_can_use_every_slot():
+    ctl = controller()
+    fill(ctl, "text", 8)
+    assert not ctl._can_run("text")
+
+
+def test_reserved_text_is_clamped_below_max_concurrent():
+    ctl = AdmissionController(max_concurrent=2, reserved_text=5)
+    assert ctl.reserved_text == 1
+    assert ctl._can_run("image")
+
+
+def test_release_hands_slot_to_highest_priority_waiter():
+    async def scenario():
+        ctl = controller()
+        fill(ctl, "text", 8)
+        image = asyncio.ensure_future(ctl.acquire("image"))
+        text = asyncio.ensure_future(ctl.acquire("text"))
+        await asyncio.sleep(0)
+        assert len(ctl._waiters["image"]) == len(ctl._waiters["text"]) == 1
+
+        ctl.release("text")
+        assert await text is None
+        assert not image.done()
+        assert ctl.in_use_by_class["text"] == 8
+
+        ctl.release("text")
+        assert await image is None
+        assert ctl.in_use_by_class == {"health": 0, "text": 7, "image": 1, "batch": 0}
+        assert ctl.in_use == 8
+
+    asyncio.run(scenario())
+
+
+def test_release_skips_waiters_that_would_take_reserved_slots():
+    async def scenario():
+        ctl = controller()
+        fill(ctl, "image", 6)
+        fill(ctl, "text", 2)
+        waiting = asyncio.ensure_future(ctl.acquire("image"))
+        await asyncio.sleep(0)
+
+        # A freed text slot stays reserved for text
+        ctl.release("text")
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        ctl.release("image")
+        assert await waiting is None
+        assert ctl.in_use_by_class["image"] == 6
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_shed():
+    async def scenario():
+        ctl = controller()
+        fill(ctl, "batch", 2)
+        waiters = [asyncio.ensure_future(ctl.acquire("batch")) for _ in range(8)]
+        await asyncio.sleep(0)
+        assert await ctl.acquire("batch") == "shed_queue_full"
+        for fut in waiters:
+            fut.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_classify():
+    assert classify("/") == "health"
+    assert classify("/admin/profile") == "health"
+    assert classify("/analyze/text") == "text"
+    assert classify("/analyze/screenshot/session/abc", "DELETE") == "text"
+    assert classify("/analyze/screenshot/session/abc", "POST") == "image"
+    assert classify("/ocr/extract") == "image"
+    assert classify("/ocr/stats") == "health"
+    assert classify("/test/batch") == "batch"
+    assert classify("/unknown") == "text"
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import bulk_moderate
+
+
+def write_source(path, texts):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, text in enumerate(texts):
+            f.write(json.dumps({"id": f"m{i}", "text": text}) + "\n")
+        f.write("{not json\n")
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Texts sent to the analyzer; texts containing "flaky" fail on their first call."""
+    seen = []
+
+    def analyze(text):
+        seen.append(text)
+        if "flaky" in text and seen.count(text) == 1:
+            raise RuntimeError("Azure timeout")
+        return {"is_harmful": "bad" in text, "risk_level": "High" if "bad" in text else "Safe",
+                "categories": {}, "confidence_scores": {}, "error": None}
+
+    monkeypatch.setattr(bulk_moderate, "_analyzer", lambda method: analyze)
+    return seen
+
+
+def run(source, output, *extra):
+    return bulk_moderate.main([str(source), str(output), "--checkpoint-every", "2", "--window", "2", *extra])
+
+
+def test_rows_keep_input_order_and_errors(tmp_path, calls):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_source(source, ["hello", "bad words", "flaky"])
+    assert run(source, output) == 0
+
+    rows = read_rows(output)
+    assert [r["index"] for r in rows] == [0, 1, 2, 3]
+    assert rows[1]["is_harmful"] is True
+    assert rows[2]["error"] == "Azure timeout"
+    assert rows[3]["kind"] == "error"
+    checkpoint = bulk_moderate.Checkpoint(f"{output}.checkpoint")
+    assert checkpoint.completed == 4
+    assert checkpoint.output_bytes == output.stat().st_size
+
+
+def test_resume_drops_rows_past_checkpoint_and_skips_done_items(tmp_path, calls):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_source(source, ["a", "b", "c", "d"])
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"index": 0, "id": "m0", "kind": "text", "error": None}) + "\n")
+        size = f.tell()
+        f.write('{"index": 1, "torn')
+    bulk_moderate.Checkpoint(f"{output}.checkpoint").save(1, size)
+
+    assert run(source, output) == 0
+    assert sorted(calls) == ["b", "c", "d"]
+    assert [r["index"] for r in read_rows(output)] == [0, 1, 2, 3, 4]
+
+
+def test_missing_or_short_output_refuses_to_resume(tmp_path, calls):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_source(source, ["a"])
+    bulk_moderate.Checkpoint(f"{output}.checkpoint").save(1, 100)
+    assert run(source, output) == 1
+
+    output.write_text("short\n")
+    assert run(source, output) == 1
+    assert calls == []
+
+
+def test_retry_errors_rewrites_failed_rows(tmp_path, calls):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_source(source, ["hello", "flaky one", "bad flaky"])
+    assert run(source, output) == 0
+    assert bulk_moderate.failed_indices(output) == {1, 2}
+
+    assert run(source, output, "--retry-errors") == 0
+    rows = read_rows(output)
+    assert [r["index"] for r in rows] == [0, 1, 2, 3]
+    assert rows[1]["error"] is None and rows[2]["is_harmful"] is True
+    # The malformed input line is not retryable
+    assert rows[3]["kind"] == "error"
+    assert calls.count("hello") == 1
+    assert bulk_moderate.Checkpoint(f"{output}.checkpoint").output_bytes == output.stat().st_size
@@ -0,0 +1,70 @@
+import numpy as np
+
+from ai_module.policy import CATEGORIES, Policy, SeverityLog, compare, from_results
+
+
+def result(confidence=0.0, **severities):
+    return {
+        "severities": severities,
+        "confidence_scores": {cat: confidence for cat in CATEGORIES},
+    }
+
+
+def records():
+    return from_results([
+        result(),                          # clean
+        result(Hate=2),                    # flagged by both
+        result(Violence=1),                # low severity only
+        result(confidence=0.9),            # high confidence, severity 0
+        {"error": "timeout"},              # failed calls are never stored
+    ])
+
+
+def test_from_results_skips_errors():
+    recs = records()
+    assert len(recs) == 4
+    assert recs["severity"][1].tolist() == [2, 0, 0, 0]
+
+
+def test_levels_fill_in_for_missing_severities():
+    recs = from_results([{"categories": {"Sexual": "Medium"}}])
+    assert recs["severity"][0].tolist() == [0, 0, 2, 0]
+
+
+def test_evaluate():
+    recs = records()
+    assert Policy("default").evaluate(recs).tolist() == [False, True, True, False]
+    assert Policy("confident", confidence_threshold=0.7).evaluate(recs).tolist() == [False, True, True, True]
+    assert Policy("hate-only", min_severity={"Hate": 2}).evaluate(recs).tolist() == [False, True, False, False]
+
+
+def test_compare_counts_changes_both_ways():
+    current = Policy("current", min_severity=1, confidence_threshold=0.7)
+    proposed = Policy("proposed", min_severity=2)
+    report = compare(records(), current, proposed)
+    assert report["records"] == 4
+    assert report["flagged_current"] == 3
+    assert report["flagged_proposed"] == 1
+    assert report["newly_flagged"] == 0
+    assert report["newly_cleared"] == 2
+    assert report["by_category"]["Hate"] == {"current": 2, "proposed": 1}
+    assert report["by_category"]["Violence"] == {"current": 2, "proposed": 0}
+
+
+def test_compare_same_policy_changes_nothing():
+    policy = Policy("default")
+    report = compare(records(), policy, policy)
+    assert report["newly_flagged"] == report["newly_cleared"] == 0
+
+
+def test_severity_log_round_trip_ignores_torn_record(tmp_path):
+    log = SeverityLog(str(tmp_path / "severities.bin"))
+    assert len(log.load()) == 0
+    log.append(result(Hate=4))
+    log.append({"error": "timeout"})
+    log.append(result(SelfHarm=1))
+    with open(log.path, "ab") as f:
+        f.write(b"\x00" * 5)
+    loaded = log.load()
+    assert len(loaded) == 2
+    assert np.array_equal(loaded["severity"][:, 0], [4, 0])
@@ -0,0 +1,63 @@
+from ai_module.utils.screenshot_session import detect_scroll_overlap
+
+HEADER, FOOTER = b"header", b"footer"
+
+
+def frame(content):
+    """Rows of a 10-row screenshot: static header, 8 content rows, static footer."""
+    return [HEADER] + [f"line{i}".encode() for i in content] + [FOOTER]
+
+
+def overlap(prev, cur):
+    return detect_scroll_overlap(prev, cur, [False] * len(cur))
+
+
+def test_scroll_down_reveals_bottom_strip():
+    result = overlap(frame(range(0, 8)), frame(range(3, 11)))
+    assert result.found
+    assert (result.top, result.bottom) == (1, 9)
+    assert result.shift == 3
+    assert result.new_box == (6, 9)
+    assert result.overlap_rows == 5
+
+
+def test_scroll_up_reveals_top_strip():
+    result = overlap(frame(range(0, 8)), frame(range(-2, 6)))
+    assert result.shift == -2
+    assert result.new_box == (1, 3)
+    assert result.overlap_rows == 6
+
+
+def test_static_header_and_footer_are_excluded():
+    result = overlap(frame(range(0, 8)), frame(range(1, 9)))
+    assert result.top == 1 and result.bottom == 9
+    assert result.new_box == (8, 9)
+
+
+def test_no_overlap_reads_whole_frame():
+    result = overlap(frame(range(0, 8)), frame(range(100, 108)))
+    assert not result.found
+    assert result.new_box == (0, 10)
+    assert result.overlap_rows == 0
+
+
+def test_identical_frame_has_nothing_new():
+    rows = frame(range(0, 8))
+    result = overlap(rows, list(rows))
+    assert result.found and result.shift == 0
+    top, bottom = result.new_box
+    assert bottom - top == 0
+
+
+def test_first_frame_or_resized_frame_reads_whole_frame():
+    rows = frame(range(0, 8))
+    assert overlap(None, rows).new_box == (0, 10)
+    assert not overlap(rows[:-1], rows).found
+
+
+def test_blank_rows_do_not_vote():
+    prev, cur = frame(range(0, 8)), frame(range(3, 11))
+    # Same frames as a clean scroll, but every content row is marked blank
+    blank = [False] + [True] * 8 + [False]
+    result = detect_scroll_overlap(prev, cur, blank)
+    assert not result.found